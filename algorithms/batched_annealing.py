@@ -0,0 +1,198 @@
+import random
+import numpy as np
+from algorithms.flow_state import FlowState
+from algorithms.graphs import terminals
+from algorithms.path_providers import sample_store
+from algorithms.path_store import PathStore
+
+
+class BatchedSA:
+    '''Runs n_chains independent simulated annealing chains in lock-step.
+
+    The chains share the graph, its PathStore and the temperature schedule of
+    SA.step (cool by (1 - a) per step, stop below 0.01), but each has its own
+    row in a 2-D flow matrix. Path choices, flow values and acceptance
+    uniforms are drawn for all chains at once and the Metropolis test is a
+    single vectorised comparison.
+
+    Each chain follows the same move rules as SA: a path is chosen, every
+    visited path sharing an edge with it is zeroed and forgotten, and the
+    chosen path gets a random flow in [1, bottleneck].
+
+    The chains need their paths up front: every enumerated path by default,
+    or, with a provider factory as for SA's `paths`, the distinct paths among
+    `sample_paths` draws from it.
+    '''
+
+    def __init__(self, G, T, a, n_chains, seed=None, path_store=None, source=None, target=None,
+                 paths=None, sample_paths=4096):
+        # G is a NetworkX graph or a CompactGraph, with SA's defaults for source and target
+        self.source, self.target = terminals(G, source, target)
+        self.T = T
+        self.a = a
+        self.n_chains = n_chains
+        self.rng = np.random.default_rng(seed)
+
+        if hasattr(G, 'to_networkx'):
+            state = FlowState.from_arrays(G.tails, G.heads, G.capacity, G.flow, sink=self.target, n_nodes=G.n_nodes)
+        else:
+            state = FlowState(G, sink=self.target)
+        self.edges = state.edges
+        if path_store is not None:
+            self.store = path_store
+        elif paths is not None:
+            provider = paths(G, self.source, self.target, state)
+            self.store = sample_store(provider, sample_paths, random.Random(seed))
+        else:
+            self.store = PathStore.enumerate(G, self.source, self.target, capacity=state.capacity)
+        if not len(self.store):
+            raise ValueError(f"no path from {self.source} to {self.target}")
+        n_edges = len(state)
+
+        # Paths padded to a common length. The padding points at an extra
+        # scratch column (index n_edges) that is reset after every step. The
+        # last row is all padding and stands for "no path".
+        lengths = np.diff(self.store.offsets)
+        self._paths = np.full((len(self.store) + 1, lengths.max()), n_edges, dtype=np.int64)
+        for i, length in enumerate(lengths.tolist()):
+            self._paths[i, :length] = self.store.path(i)
+
+        self._into_sink = np.append(state.into_sink, False)
+        self.flow = np.zeros((n_chains, n_edges + 1), dtype=np.int64)
+        self.flow[:, :n_edges] = state.flow
+        # Per-chain owner of each edge among the visited paths (-1 if none)
+        self._owner = np.full((n_chains, n_edges + 1), -1, dtype=np.int64)
+
+        self.max_inflow = np.zeros(n_chains, dtype=np.int64)
+        # Flow into the sink of each chain's current state, kept up to date
+        self._inflow = np.full(n_chains, state.sink_inflow(), dtype=np.int64)
+        self.best_inflow = self.max_inflow.copy()
+        self._best_flow = self.flow.copy()
+        # Edges each chain has changed since its best flow was last updated,
+        # so that a new best only copies those. A chain that changes more
+        # than fit is marked with a count past the end and copied whole.
+        self._pending = np.empty((n_chains, 16 * self._paths.shape[1] ** 2), dtype=np.int64)
+        self._n_pending = np.zeros(n_chains, dtype=np.int64)
+        self._rows = np.arange(n_chains)[:, None]
+
+    def step(self):
+        '''Advance every chain by one move. Returns the candidate and accepted inflows.
+
+        Only the edges of the chosen paths and of the paths they evict are
+        read or written, so the cost of a step does not grow with the size of
+        the graph.
+        '''
+        self.T = self.T*(1-self.a)
+        rows = self._rows
+        n_edges = self.flow.shape[1] - 1
+        no_path = len(self._paths) - 1
+
+        paths = self.rng.integers(len(self.store), size=self.n_chains)
+        edge_ids = self._paths[paths]
+        flows = self.rng.integers(1, self.store.bottleneck[paths] + 1)
+        p = self.rng.random(self.n_chains)
+
+        # Visited paths owning an edge of the chosen path get evicted. One
+        # path can own several of its edges, so keep each only once, and
+        # only as many columns as the chain evicting the most paths needs.
+        hit = np.sort(self._owner[rows, edge_ids], axis=1)
+        hit[:, 1:][hit[:, 1:] == hit[:, :-1]] = -1
+        hit[hit < 0] = no_path
+        hit.sort(axis=1)
+        hit = hit[:, :max(1, int((hit < no_path).sum(axis=1).max()))]
+        evicted_ids = self._paths[hit].reshape(self.n_chains, -1)
+
+        # Evicted paths never share an edge, so their flows are summed once
+        evicted_flow = self.flow[rows, evicted_ids]
+        evicted_owner = self._owner[rows, evicted_ids]
+        delta = -(evicted_flow * self._into_sink[evicted_ids]).sum(axis=1)
+        self.flow[rows, evicted_ids] = 0
+        self._owner[rows, evicted_ids] = -1
+
+        chosen_flow = self.flow[rows, edge_ids]
+        chosen_owner = self._owner[rows, edge_ids]
+        into_sink = self._into_sink[edge_ids]
+        delta += ((flows[:, None] - chosen_flow) * into_sink).sum(axis=1)
+        self.flow[rows, edge_ids] = flows[:, None]
+        self._owner[rows, edge_ids] = paths[:, None]
+        self.flow[:, n_edges] = 0
+        self._owner[:, n_edges] = -1
+
+        curr_inflow = self._inflow + delta
+
+        # Metropolis acceptance across all chains at once
+        E = np.minimum(curr_inflow - self.max_inflow, 0)
+        accepted = (curr_inflow >= self.max_inflow) | (p < np.exp(E / self.T))
+
+        # Undo the move of rejected chains, in reverse order
+        rejected = np.flatnonzero(~accepted)
+        if len(rejected):
+            back = rejected[:, None]
+            self.flow[back, edge_ids[rejected]] = chosen_flow[rejected]
+            self._owner[back, edge_ids[rejected]] = chosen_owner[rejected]
+            self.flow[back, evicted_ids[rejected]] = evicted_flow[rejected]
+            self._owner[back, evicted_ids[rejected]] = evicted_owner[rejected]
+
+        self._inflow = np.where(accepted, curr_inflow, self._inflow)
+        self.max_inflow = np.where(accepted, curr_inflow, self.max_inflow)
+
+        self._log_changes(accepted, np.concatenate([evicted_ids, edge_ids], axis=1))
+
+        improved = self.max_inflow > self.best_inflow
+        if improved.any():
+            self.best_inflow[improved] = self.max_inflow[improved]
+            self._update_best(np.flatnonzero(improved))
+
+        return curr_inflow, self.max_inflow.copy()
+
+    @property
+    def best_flow(self):
+        # Each chain's flow vector at its best inflow so far
+        return self._best_flow[:, :-1]
+
+    def _log_changes(self, accepted, changed):
+        chains = np.flatnonzero(accepted)
+        capacity = self._pending.shape[1]
+        start = self._n_pending[chains]
+        fits = start + changed.shape[1] <= capacity
+        logged = chains[fits]
+        columns = start[fits][:, None] + np.arange(changed.shape[1])
+        self._pending[logged[:, None], columns] = changed[accepted][fits]
+        self._n_pending[logged] += changed.shape[1]
+        self._n_pending[chains[~fits]] = capacity + 1
+
+    def _update_best(self, chains):
+        capacity = self._pending.shape[1]
+        n_pending = self._n_pending[chains]
+        whole = chains[n_pending > capacity]
+        self._best_flow[whole] = self.flow[whole]
+
+        chains, n_pending = chains[n_pending <= capacity], n_pending[n_pending <= capacity]
+        if len(chains):
+            width = n_pending.max()
+            columns = np.where(np.arange(width) < n_pending[:, None], self._pending[chains, :width], self.flow.shape[1] - 1)
+            self._best_flow[chains[:, None], columns] = self.flow[chains[:, None], columns]
+        self._n_pending[chains] = 0
+        self._n_pending[whole] = 0
+
+    def run(self):
+        '''Anneal every chain until the temperature drops below 0.01.
+
+        Returns per-step arrays of shape (steps, n_chains) for the candidate
+        and accepted inflows, the temperature per step, and each chain's best
+        inflow and the flow vector that achieved it.
+        '''
+        candidate, accepted, temperature = [], [], []
+        while self.T >= 0.01:
+            curr_inflow, max_inflow = self.step()
+            candidate.append(curr_inflow)
+            accepted.append(max_inflow)
+            temperature.append(self.T)
+
+        return {
+            'candidate': np.array(candidate).reshape(-1, self.n_chains),
+            'accepted': np.array(accepted).reshape(-1, self.n_chains),
+            'temperature': np.array(temperature),
+            'best_inflow': self.best_inflow.copy(),
+            'best_flow': self.best_flow.copy(),
+        }
@@ -0,0 +1,147 @@
+import networkx as nx
+import numpy as np
+
+
+def index_edges(G):
+    '''Assign every edge of G a stable integer id.
+
+    Ids follow the graph's own edge iteration order, so two calls on the same
+    graph (or on an unchanged copy of it) always agree.
+    '''
+    edges = list(G.edges())
+    edge_index = {edge: i for i, edge in enumerate(edges)}
+
+    return edges, edge_index
+
+
+class FlowState:
+    '''Edge capacities and flows of a network held in flat NumPy arrays.
+
+    Every edge is addressed by its integer id (see index_edges). Flow changes
+    are applied as small deltas and recorded in an undo log, so a candidate
+    move can be rolled back in time proportional to the edges it touched
+    instead of copying the whole graph up front.
+
+    When a sink is given, the total flow into it is kept up to date in
+    self.inflow as flows change, rather than being recomputed.
+    '''
+
+    def __init__(self, G, sink=None):
+        self._edges, self._edge_index = index_edges(G)
+        self.capacity = np.array([G[u][v].get('capacity', 0) for u, v in self._edges], dtype=np.int64)
+        self.flow = np.array([G[u][v].get('flow', 0) for u, v in self._edges], dtype=np.int64)
+
+        # Dense integer ids of every edge's end points, for array-based
+        # traversals (see node_id)
+        self.labels = list(G.nodes)
+        self._node_index = {node: i for i, node in enumerate(self.labels)}
+        self.n_nodes = len(self.labels)
+        self.tails = np.array([self._node_index[u] for u, v in self._edges], dtype=np.int64)
+        self.heads = np.array([self._node_index[v] for u, v in self._edges], dtype=np.int64)
+
+        self.into_sink = np.array([v == sink for u, v in self._edges], dtype=bool)
+        self.inflow = self.sink_inflow()
+        self._committed_inflow = self.inflow
+
+        # Keep the original graph around only as a template for to_graph()
+        self._template = G
+        self._undo = []
+
+    @classmethod
+    def from_arrays(cls, tails, heads, capacity, flow=None, sink=None, n_nodes=None):
+        '''Build the state straight from edge arrays over dense node ids.
+
+        Edge i runs from tails[i] to heads[i]. Nothing per edge is created in
+        Python; the (u, v) tuples of edges and edge_index are only built if
+        something asks for them.
+        '''
+        state = cls.__new__(cls)
+        state._edges = state._edge_index = None
+        state.capacity = np.asarray(capacity, dtype=np.int64)
+        state.flow = np.zeros(len(state.capacity), dtype=np.int64) if flow is None else np.array(flow, dtype=np.int64)
+
+        state.labels = None
+        state._node_index = None
+        state.tails = np.asarray(tails, dtype=np.int64)
+        state.heads = np.asarray(heads, dtype=np.int64)
+        state.n_nodes = n_nodes if n_nodes is not None else int(max(state.tails.max(initial=-1), state.heads.max(initial=-1))) + 1
+
+        state.into_sink = state.heads == sink
+        state.inflow = state.sink_inflow()
+        state._committed_inflow = state.inflow
+
+        state._template = None
+        state._undo = []
+
+        return state
+
+    @property
+    def edges(self):
+        # (u, v) of every edge by id
+        if self._edges is None:
+            self._edges = list(zip(self.tails.tolist(), self.heads.tolist()))
+        return self._edges
+
+    @property
+    def edge_index(self):
+        # Edge id of every (u, v)
+        if self._edge_index is None:
+            self._edge_index = {edge: i for i, edge in enumerate(self.edges)}
+        return self._edge_index
+
+    def node_id(self, node):
+        # Dense id of a node (states built from arrays already use dense ids)
+        return node if self._node_index is None else self._node_index[node]
+
+    def __len__(self):
+        return len(self.capacity)
+
+    def path_ids(self, path):
+        # Translate a path given as (u, v) tuples into edge ids
+        return np.fromiter((self.edge_index[edge] for edge in path), dtype=np.int64, count=len(path))
+
+    def assign(self, array, edge_ids, value):
+        ''' Set array[edge_ids] = value for any per-edge array, remembering the old values. '''
+        self._undo.append((array, edge_ids, array[edge_ids].copy()))
+        array[edge_ids] = value
+
+    def set_flow(self, edge_ids, value):
+        into_sink = self.into_sink[edge_ids]
+        if into_sink.any():
+            self.inflow += int((value - self.flow[edge_ids][into_sink]).sum())
+        self.assign(self.flow, edge_ids, value)
+
+    def sink_inflow(self):
+        # Full recompute of the flow into the sink
+        return int(self.flow[self.into_sink].sum())
+
+    def zero(self):
+        self.flow[:] = 0
+        self._undo.clear()
+        self.inflow = self._committed_inflow = 0
+
+    def commit(self):
+        # Accept every change since the last commit/rollback
+        self._undo.clear()
+        self._committed_inflow = self.inflow
+
+    def rollback(self):
+        # Undo every change since the last commit/rollback, newest first
+        while self._undo:
+            array, edge_ids, old_values = self._undo.pop()
+            array[edge_ids] = old_values
+        self.inflow = self._committed_inflow
+
+    def to_graph(self):
+        ''' Build a NetworkX graph carrying the current flows. '''
+        if self._template is None:
+            G = nx.DiGraph()
+            G.add_nodes_from(range(self.n_nodes))
+            G.add_edges_from(self.edges)
+        else:
+            G = nx.DiGraph(self._template)
+        for (u, v), capacity, flow in zip(self.edges, self.capacity.tolist(), self.flow.tolist()):
+            G[u][v]['capacity'] = capacity
+            G[u][v]['flow'] = flow
+
+        return G
@@ -0,0 +1,181 @@
+'''Bulk loading of large networks into flat integer arrays.
+
+Edge lists are read from CSV, NumPy .npz or memory-mapped binary files
+straight into NumPy arrays. Arbitrary node ids are relabelled to dense
+integers, and the result is a CompactGraph that SA and PathStore accept in
+place of a NetworkX graph:
+
+    graph = load_graph('network.csv', source='plant', sink='city')
+    sa = SA(graph, T, a, paths=RandomWalkPaths, seed=5)
+
+CSV files hold one edge per line as tail, head, capacity and optionally
+flow (a header line is skipped). .npz files hold arrays named tails, heads,
+capacity and optionally flow. Binary files are EDGE_DTYPE records, either as
+a structured .npy or as raw little-endian bytes.
+'''
+import os
+import numpy as np
+import networkx as nx
+
+EDGE_DTYPE = np.dtype([('tail', '<i8'), ('head', '<i8'), ('capacity', '<i8'), ('flow', '<i8')])
+
+
+class CompactGraph:
+    '''A directed network as flat arrays over dense node ids 0..n_nodes-1.
+
+    Edges are unique, without self loops and ordered by (tail, head), which is
+    also the edge order of to_networkx(), so edge ids agree between the two.
+    labels[i] is the original id of node i; source and sink are dense ids.
+    '''
+
+    def __init__(self, tails, heads, capacity, flow, labels, source, sink):
+        self.tails = tails
+        self.heads = heads
+        self.capacity = capacity
+        self.flow = flow
+        self.labels = labels
+        self.source = source
+        self.sink = sink
+        self._graph = None
+
+    @property
+    def n_nodes(self):
+        return len(self.labels)
+
+    @property
+    def n_edges(self):
+        return len(self.tails)
+
+    @property
+    def nbytes(self):
+        return self.tails.nbytes + self.heads.nbytes + self.capacity.nbytes + self.flow.nbytes + self.labels.nbytes
+
+    def node_id(self, label):
+        ''' Dense id of the node originally called label. '''
+        # Compare the label itself, not a cast to the labels' fixed-width
+        # dtype, which would truncate it into another node's id. Integer ids
+        # may be given as text (as SA_SOURCE and SA_SINK are).
+        key = label
+        if self.labels.dtype.kind in 'iu' and isinstance(label, str):
+            try:
+                key = int(label)
+            except ValueError:
+                raise KeyError(f"no node {label!r} in the graph") from None
+        elif self.labels.dtype.kind == 'U':
+            key = str(label)
+        try:
+            i = int(np.searchsorted(self.labels, key))
+        except TypeError:
+            raise KeyError(f"no node {label!r} in the graph") from None
+        if i == len(self.labels) or self.labels[i] != key:
+            raise KeyError(f"no node {label!r} in the graph")
+
+        return i
+
+    def to_networkx(self):
+        ''' NetworkX view with dense node ids, built (once) only when asked for. '''
+        if self._graph is None:
+            G = nx.DiGraph()
+            G.add_nodes_from(range(self.n_nodes))
+            G.add_edges_from(
+                (u, v, {'capacity': c, 'flow': f})
+                for u, v, c, f in zip(self.tails.tolist(), self.heads.tolist(),
+                                      self.capacity.tolist(), self.flow.tolist()))
+            self._graph = G
+
+        return self._graph
+
+
+def from_arrays(tails, heads, capacity, flow=None, source=None, sink=None):
+    '''CompactGraph from edge arrays over arbitrary node ids.
+
+    Parallel edges are merged (capacities and flows added up) and self loops
+    dropped. source and sink are original node ids; when not given they
+    default to the smallest and largest id, as the demo network assumes.
+    '''
+    tails = np.asarray(tails)
+    heads = np.asarray(heads)
+    capacity = np.asarray(capacity, dtype=np.int64)
+    flow = np.zeros(len(capacity), dtype=np.int64) if flow is None else np.asarray(flow, dtype=np.int64)
+
+    # Relabel to dense ids in sorted order of the original ids
+    labels, dense = np.unique(np.concatenate([tails, heads]), return_inverse=True)
+    dense = dense.reshape(-1)
+    tails, heads = dense[:len(tails)], dense[len(tails):]
+
+    keep = tails != heads
+    key = tails[keep].astype(np.int64) * len(labels) + heads[keep]
+    unique_keys, edge = np.unique(key, return_inverse=True)
+    merged_capacity = np.bincount(edge, weights=capacity[keep], minlength=len(unique_keys)).astype(np.int64)
+    merged_flow = np.bincount(edge, weights=flow[keep], minlength=len(unique_keys)).astype(np.int64)
+
+    graph = CompactGraph(unique_keys // len(labels), unique_keys % len(labels), merged_capacity, merged_flow,
+                         labels, 0, len(labels) - 1)
+    if source is not None:
+        graph.source = graph.node_id(source)
+    if sink is not None:
+        graph.sink = graph.node_id(sink)
+
+    return graph
+
+
+def _node_column(values):
+    # Integer node ids stay integers; anything else is kept as strings
+    try:
+        return values.astype(np.int64)
+    except ValueError:
+        return values
+
+
+def load_csv(path, source=None, sink=None, delimiter=','):
+    ''' Edge list with columns tail, head, capacity[, flow]. '''
+    with open(path) as f:
+        first = f.readline().split(delimiter)
+        try:
+            float(first[2])
+            f.seek(0)
+        except (IndexError, ValueError):
+            pass  # Header line, already consumed
+        # (The header is skipped by hand: loadtxt's skiprows loses rows
+        # between its read chunks when dtype=str in NumPy 2.1)
+        columns = np.loadtxt(f, dtype=str, delimiter=delimiter, ndmin=2)
+    flow = columns[:, 3].astype(np.int64) if columns.shape[1] > 3 else None
+
+    return from_arrays(_node_column(columns[:, 0]), _node_column(columns[:, 1]),
+                       columns[:, 2].astype(np.int64), flow, source, sink)
+
+
+def load_npz(path, source=None, sink=None):
+    ''' Arrays tails, heads, capacity[, flow] from an .npz file. '''
+    with np.load(path) as arrays:
+        flow = arrays['flow'] if 'flow' in arrays.files else None
+        return from_arrays(arrays['tails'], arrays['heads'], arrays['capacity'], flow, source, sink)
+
+
+def load_binary(path, source=None, sink=None):
+    ''' EDGE_DTYPE records, memory-mapped from a structured .npy or a raw file. '''
+    if path.endswith('.npy'):
+        records = np.load(path, mmap_mode='r')
+    else:
+        records = np.memmap(path, dtype=EDGE_DTYPE, mode='r')
+
+    return from_arrays(records['tail'], records['head'], records['capacity'], records['flow'], source, sink)
+
+
+def save_npz(graph, path):
+    ''' Write a CompactGraph (with its original node ids) so that load_npz reads it back. '''
+    np.savez(path, tails=graph.labels[graph.tails], heads=graph.labels[graph.heads],
+             capacity=graph.capacity, flow=graph.flow)
+
+
+def load_graph(path, source=None, sink=None):
+    ''' Load a CompactGraph, choosing the reader by file extension. '''
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.csv', '.txt'):
+        return load_csv(path, source, sink)
+    if extension == '.tsv':
+        return load_csv(path, source, sink, delimiter='\t')
+    if extension == '.npz':
+        return load_npz(path, source, sink)
+
+    return load_binary(path, source, sink)
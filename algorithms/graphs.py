@@ -0,0 +1,71 @@
+import hashlib
+import os
+import networkx as nx
+from algorithms.graph_loader import load_graph
+
+
+def graph_fingerprint(G):
+    '''Stable hash of a graph's edges, capacities and initial flows.
+
+    Edge order is part of the fingerprint because edge ids (and so SA runs)
+    depend on it.
+    '''
+    digest = hashlib.sha1()
+    if hasattr(G, 'to_networkx'):
+        # A CompactGraph: hash its arrays rather than walking edges in Python
+        for array in (G.tails, G.heads, G.capacity, G.flow):
+            digest.update(array.tobytes())
+        digest.update(repr((G.source, G.sink)).encode())
+        return digest.hexdigest()
+
+    for u, v, data in G.edges(data=True):
+        digest.update(repr((u, v, data.get('capacity', 0), data.get('flow', 0))).encode())
+
+    return digest.hexdigest()
+
+
+def terminals(G, source=None, target=None):
+    '''Source and sink of G unless given: a CompactGraph's own, else the
+    demo network's convention of node 0 to the largest node.
+    '''
+    compact = hasattr(G, 'to_networkx')
+    if source is None:
+        source = G.source if compact else 0
+    if target is None:
+        target = G.sink if compact else max(G.nodes)
+
+    return source, target
+
+
+def sample_graph():
+    ''' The 6-node demo network used by the Simulated Annealing tab. '''
+    G = nx.DiGraph()
+    G.add_edges_from([(0, 1, {'flow': 5}), (0, 1,{'capacity': 10}),
+     (0, 2,{'flow': 3}), (0, 2,{'capacity': 8}),
+      (0,3,{'flow': 4}), (0,3,{'capacity': 11}),
+       (1,2, {'flow': 3}), (1,2,{'capacity': 9}),
+        (1,5, {'flow': 2}), (1,5,{'capacity': 3}),
+         (2,4, {'flow': 7}), (2,4,{'capacity': 9}),
+          (2,5, {'flow': 1}), (2,5,{'capacity': 8}),
+           (3,2, {'flow': 2}), (3,2,{'capacity': 8}),
+            (3,4,{'flow': 2}), (3,4,{'capacity': 12}),
+             (4,5, {'flow': 9}), (4,5,{'capacity': 9})])
+
+    return G
+
+
+def configured_graph():
+    '''The network the apps run on, with its source and sink.
+
+    SA_GRAPH names a file for graph_loader.load_graph (CSV, .npz or binary
+    edge list), with SA_SOURCE and SA_SINK naming its terminals by their
+    original node ids. Without SA_GRAPH this is the demo network, from node
+    0 to its largest node.
+    '''
+    path = os.environ.get('SA_GRAPH')
+    if path:
+        graph = load_graph(path, source=os.environ.get('SA_SOURCE'), sink=os.environ.get('SA_SINK'))
+        return graph, graph.source, graph.sink
+
+    G = sample_graph()
+    return G, 0, max(G.nodes)
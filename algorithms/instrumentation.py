@@ -0,0 +1,79 @@
+import time
+
+# SA method -> phase it is timed as. Phases nest: a step (metropolis) is the
+# successor (select_path, min_capacity, conservation, visit, state_update,
+# heuristic) followed by the acceptance test and accept or reject;
+# conservation includes the evictions it makes.
+PHASES = {
+    '_metropolis': 'step',
+    '_successor': 'successor',
+    '_select_path': 'select_path',
+    '_get_min_capacity': 'min_capacity',
+    '_enforce_conservation': 'conservation',
+    '_evict': 'evict',
+    '_visit': 'visit',
+    '_apply_flow': 'state_update',
+    '_heuristic': 'heuristic',
+    '_acceptance_test': 'acceptance_test',
+    '_accept': 'accept',
+    '_reject': 'reject',
+}
+
+
+class Instrumentation:
+    '''Cumulative timers and call counters for the phases of SA steps.
+
+    attach() shadows the engine's phase methods with timed wrappers on that
+    instance only, and detach() removes them again, so an engine that is not
+    instrumented runs exactly the code it would otherwise. `hook`, if given,
+    is called as hook(phase, seconds) after every timed call, e.g. to feed an
+    external profiler or tracer.
+    '''
+
+    def __init__(self, hook=None):
+        self.hook = hook
+        self.times = dict.fromkeys(PHASES.values(), 0.0)
+        self.counts = dict.fromkeys(PHASES.values(), 0)
+
+    def _timed(self, method, phase):
+        times, counts, hook = self.times, self.counts, self.hook
+        clock = time.perf_counter
+
+        def timed(*args):
+            start = clock()
+            result = method(*args)
+            elapsed = clock() - start
+            times[phase] += elapsed
+            counts[phase] += 1
+            if hook is not None:
+                hook(phase, elapsed)
+            return result
+
+        return timed
+
+    def attach(self, sa):
+        for name, phase in PHASES.items():
+            setattr(sa, name, self._timed(getattr(sa, name), phase))
+
+    def detach(self, sa):
+        for name in PHASES:
+            sa.__dict__.pop(name, None)
+
+    def summary(self):
+        ''' Totals and means per phase, plus acceptance rate and evictions per step. '''
+        steps = self.counts['step']
+        decided = self.counts['accept'] + self.counts['reject']
+
+        return {
+            'steps': steps,
+            'acceptance_rate': self.counts['accept'] / decided if decided else None,
+            'evictions_per_step': self.counts['evict'] / steps if steps else None,
+            'phases': {
+                phase: {
+                    'calls': self.counts[phase],
+                    'total_s': self.times[phase],
+                    'mean_us': 1e6 * self.times[phase] / self.counts[phase] if self.counts[phase] else None,
+                }
+                for phase in self.times
+            },
+        }
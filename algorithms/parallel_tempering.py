@@ -0,0 +1,219 @@
+'''Parallel tempering (replica exchange) on top of the SA engine.
+
+One SA replica per rung of a temperature ladder runs Metropolis moves at a
+fixed temperature in its own worker process. After every `swap_every` steps
+neighbouring rungs try to exchange states; rather than shipping flow vectors
+between processes, a swap exchanges the temperatures of the two replicas.
+
+    python -m algorithms.parallel_tempering --temps 0.5 1 2 4 8 --rounds 200
+
+The CLI runs on the configured network and path provider (see
+graphs.configured_graph and path_providers.configured_paths).
+'''
+import argparse
+import math
+import multiprocessing
+import random
+import time
+from algorithms.graphs import configured_graph, terminals
+from algorithms.path_providers import PATH_PROVIDERS, configured_paths
+from algorithms.path_store import PathStore
+from algorithms.simulated_annealing import SA
+
+
+def _replica_worker(conn, G, path_store, paths, seed, source, target):
+    sa = SA(G, 1, 0, path_store=path_store, paths=paths, seed=seed, source=source, target=target)
+    best_flow = sa.flow.copy()
+    steps = 0
+
+    while True:
+        command, T, n_steps = conn.recv()
+        if command == 'run':
+            sa.T = T
+            best = sa.best_inflow
+            for _ in range(n_steps):
+                sa._metropolis(T)
+                if sa.best_inflow > best:
+                    best = sa.best_inflow
+                    best_flow = sa.flow.copy()
+            steps += n_steps
+            conn.send((sa.max_inflow, sa.best_inflow, time.process_time()))
+        elif command == 'best':
+            conn.send((sa.best_inflow, best_flow, steps))
+        else:
+            conn.close()
+            return
+
+
+class ParallelTempering:
+    '''Replica-exchange optimiser reusing SA's move and objective code.
+
+    `temperatures` is the ladder, one replica (and worker process) per entry.
+    G is a NetworkX graph or a CompactGraph, with SA's defaults for source and
+    target. paths is a provider factory as for SA; a PathStore is only
+    enumerated for the default, enumerated paths.
+    '''
+
+    def __init__(self, G, temperatures, seed=None, path_store=None, source=None, target=None, paths=None):
+        self.temperatures = sorted(temperatures)
+        self.rng = random.Random(seed)
+        source, target = terminals(G, source, target)
+        if path_store is None and paths is None:
+            path_store = PathStore.enumerate(G, source, target)
+        seeds = [self.rng.randrange(2**31) for _ in self.temperatures]
+
+        self._processes = []
+        self._replicas = []
+        for replica_seed in seeds:
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_replica_worker, daemon=True,
+                                              args=(child, G, path_store, paths, replica_seed, source, target))
+            process.start()
+            self._processes.append(process)
+            self._replicas.append(parent)
+
+        # ladder[k] is the replica currently running at temperatures[k]
+        self.ladder = list(range(len(self.temperatures)))
+        self.swap_attempts = [0] * (len(self.temperatures) - 1)
+        self.swap_accepts = [0] * (len(self.temperatures) - 1)
+
+    def close(self):
+        for replica in self._replicas:
+            replica.send(('stop', None, None))
+        for process in self._processes:
+            process.join()
+        self._processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _swap(self, k, inflow):
+        '''Try to exchange the replicas at rungs k and k + 1.
+
+        With energy -inflow the usual acceptance min(1, exp((b_k - b_k1)(E_k - E_k1)))
+        becomes exp((b_k - b_k1)(inflow_k1 - inflow_k)).
+        '''
+        i, j = self.ladder[k], self.ladder[k + 1]
+        delta = (1 / self.temperatures[k] - 1 / self.temperatures[k + 1]) * (inflow[j] - inflow[i])
+        self.swap_attempts[k] += 1
+        if delta >= 0 or self.rng.random() < math.exp(delta):
+            self.ladder[k], self.ladder[k + 1] = j, i
+            self.swap_accepts[k] += 1
+
+    def run(self, rounds, swap_every=10, target=None):
+        '''Run `rounds` rounds of `swap_every` steps per replica followed by a swap sweep.
+
+        Swap sweeps alternate between even and odd neighbour pairs. Returns a
+        report with the best inflow and flow vector, swap acceptance rates per
+        neighbour pair and, if `target` is given, the wall-clock and CPU time
+        until some replica first reached it.
+        '''
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        worker_cpu = [0.0] * len(self._replicas)
+        inflow = [0] * len(self._replicas)
+        best_inflow = 0
+        time_to_target = cpu_to_target = None
+
+        for round_number in range(rounds):
+            for k, replica in enumerate(self.ladder):
+                self._replicas[replica].send(('run', self.temperatures[k], swap_every))
+            for replica, conn in enumerate(self._replicas):
+                inflow[replica], best, worker_cpu[replica] = conn.recv()
+                best_inflow = max(best_inflow, best)
+
+            if target is not None and time_to_target is None and best_inflow >= target:
+                time_to_target = time.perf_counter() - start_wall
+                cpu_to_target = time.process_time() - start_cpu + sum(worker_cpu)
+
+            for k in range(round_number % 2, len(self.temperatures) - 1, 2):
+                self._swap(k, inflow)
+
+        best_flow = None
+        best_inflow = -1
+        steps = 0
+        for conn in self._replicas:
+            conn.send(('best', None, None))
+            replica_best, replica_flow, replica_steps = conn.recv()
+            steps += replica_steps
+            if replica_best > best_inflow:
+                best_inflow, best_flow = replica_best, replica_flow
+
+        return {
+            'best_inflow': best_inflow,
+            'best_flow': best_flow,
+            'steps': steps,
+            'swap_acceptance': [accepts / attempts if attempts else 0.0
+                                for accepts, attempts in zip(self.swap_accepts, self.swap_attempts)],
+            'time_to_target': time_to_target,
+            'cpu_to_target': cpu_to_target,
+            'wall_time': time.perf_counter() - start_wall,
+            'cpu_time': time.process_time() - start_cpu + sum(worker_cpu),
+        }
+
+
+def sa_restarts(G, cpu_budget, T, a, target=None, seed=None, source=None, sink=None, paths=None):
+    '''Baseline for comparison: rerun plain SA with fresh seeds until cpu_budget is spent.
+
+    Returns the best inflow found, the CPU time at which `target` was first
+    reached (or None) and the number of restarts.
+    '''
+    rng = random.Random(seed)
+    source, sink = terminals(G, source, sink)
+    path_store = PathStore.enumerate(G, source, sink) if paths is None else None
+    start = time.process_time()
+    best_inflow = 0
+    cpu_to_target = None
+    restarts = 0
+
+    while time.process_time() - start < cpu_budget:
+        sa = SA(G, T, a, path_store=path_store, paths=paths, seed=rng.randrange(2**31), source=source, target=sink)
+        while sa.running:
+            sa.step()
+            if target is not None and cpu_to_target is None and sa.best_inflow >= target:
+                cpu_to_target = time.process_time() - start
+        best_inflow = max(best_inflow, sa.best_inflow)
+        restarts += 1
+
+    return best_inflow, cpu_to_target, restarts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run parallel tempering on the configured network.")
+    parser.add_argument("--temps", type=float, nargs="+", default=[0.5, 1, 2, 4, 8])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--swap-every", type=int, default=10)
+    parser.add_argument("--target", type=float)
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--compare", action="store_true",
+                        help="also rerun plain SA for the same CPU time and report its best")
+    parser.add_argument("--sa-temp", type=float, default=12)
+    parser.add_argument("--sa-rate", type=float, default=0.01)
+    parser.add_argument("--paths", choices=sorted(PATH_PROVIDERS), help="path provider (default: SA_PATHS)")
+    args = parser.parse_args(argv)
+
+    G, source, sink = configured_graph()
+    paths = PATH_PROVIDERS[args.paths or configured_paths()]
+    with ParallelTempering(G, args.temps, seed=args.seed, source=source, target=sink, paths=paths) as pt:
+        report = pt.run(args.rounds, args.swap_every, args.target)
+
+    print(f"best inflow:     {report['best_inflow']}")
+    print(f"steps:           {report['steps']}")
+    print(f"wall / cpu time: {report['wall_time']:.3f}s / {report['cpu_time']:.3f}s")
+    if args.target is not None:
+        print(f"time to target:  {report['time_to_target']} (cpu {report['cpu_to_target']})")
+    for k, rate in enumerate(report['swap_acceptance']):
+        print(f"swap T={pt.temperatures[k]:g} <-> T={pt.temperatures[k + 1]:g}: {rate:.2%}")
+
+    if args.compare:
+        best_inflow, cpu_to_target, restarts = sa_restarts(
+            G, report['cpu_time'], args.sa_temp, args.sa_rate, args.target, args.seed, source, sink, paths)
+        print(f"SA restarts in the same cpu time: best {best_inflow} after {restarts} runs"
+              + (f", target at cpu {cpu_to_target}" if args.target is not None else ""))
+
+
+if __name__ == '__main__':
+    main()
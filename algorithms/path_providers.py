@@ -0,0 +1,321 @@
+import os
+import networkx as nx
+import numpy as np
+from algorithms.path_store import PathStore
+
+
+class PathProvider:
+    '''Source of source-to-sink paths for the SA engine.
+
+    A path is handed out as an integer id; edges(path) gives its edge ids
+    (see FlowState) and min_capacity(path) its bottleneck capacity. Providers
+    are built with a factory signature of (G, source, target, state), so SA can
+    be told which one to use, e.g. SA(G, T, a, paths=RandomWalkPaths).
+    '''
+
+    def __init__(self, state):
+        self.state = state
+        self._ids = {}
+        self._edges = {}
+        self._next_id = 0
+        # Whether a path currently holds flow; SA points this at its visited
+        # paths. Providers only forget paths for which this is False.
+        self.holds_flow = lambda path: True
+
+    def _intern(self, edge_ids):
+        # Give each distinct path a stable id the first time it is seen
+        key = tuple(edge_ids)
+        path = self._ids.get(key)
+        if path is None:
+            path = self._next_id
+            self._next_id += 1
+            self._ids[key] = path
+            self._edges[path] = np.array(key, dtype=np.int64)
+        return path
+
+    def _forget(self, path):
+        # Drop an interned path; its id is never handed out again
+        del self._ids[tuple(self._edges.pop(path).tolist())]
+
+    def _retain(self, path):
+        # Whether the provider itself still hands path out
+        return False
+
+    def release(self, path):
+        # The engine stopped using path (its move was rejected, or it was
+        # evicted); forget it unless it holds flow or is still handed out,
+        # so memory follows the paths in use rather than the paths drawn
+        if path in self._edges and not self.holds_flow(path) and not self._retain(path):
+            self._forget(path)
+
+    def _node_path_ids(self, node_path):
+        return [self.state.edge_index[edge] for edge in zip(node_path, node_path[1:])]
+
+    def draw(self, rng):
+        raise NotImplementedError
+
+    def restore(self, path, edge_ids):
+        # Id in this provider of a path saved (as path, with these edges) by
+        # another instance; ids are handed out as paths are first seen
+        return self._intern(edge_ids.tolist())
+
+    def get_state(self):
+        # What a checkpoint needs to resume the provider's draws exactly,
+        # as JSON-able values (see SA.save_checkpoint)
+        return {}
+
+    def set_state(self, state):
+        pass
+
+    def edges(self, path):
+        return self._edges[path]
+
+    def min_capacity(self, path):
+        return int(self.state.capacity[self._edges[path]].min())
+
+
+class EnumeratedPaths(PathProvider):
+    '''Every simple path of at most `cutoff` edges, enumerated up front.
+
+    This is the original behaviour; it is exact but the number of paths grows
+    exponentially with the size of the network. The paths are kept in a
+    PathStore, which can be passed in to share one enumeration between
+    several SA instances on the same graph.
+    '''
+
+    def __init__(self, G, source, target, state, cutoff=9, store=None):
+        super().__init__(state)
+        self.store = store if store is not None else PathStore.enumerate(G, source, target, cutoff, state.capacity)
+        if not len(self.store):
+            raise ValueError(f"no path from {source} to {target} of at most {cutoff} edges")
+
+    @property
+    def all_paths(self):
+        # Materialise the paths as (u, v) tuples only when asked for
+        edges = self.state.edges
+        return [[edges[e] for e in self.store.path(i).tolist()] for i in range(len(self.store))]
+
+    def draw(self, rng):
+        # select a random path from the list of paths from source to sink
+        return rng.randrange(len(self.store))
+
+    def release(self, path):
+        # The store holds every path for good
+        pass
+
+    def restore(self, path, edge_ids):
+        # Enumerated path ids are the same in every instance on the same graph
+        if not 0 <= path < len(self.store) or not np.array_equal(self.store.path(path), edge_ids):
+            raise ValueError(f"saved path {path} is not path {path} of this graph's enumeration")
+        return path
+
+    def edges(self, path):
+        return self.store.path(path)
+
+    def min_capacity(self, path):
+        return int(self.store.bottleneck[path])
+
+
+def _reachable(tails, heads, n_nodes, start):
+    '''Boolean mask of the nodes reachable from start along tails -> heads.
+
+    Breadth-first, one NumPy pass per level; swap tails and heads to get the
+    nodes that can reach start instead.
+    '''
+    order = np.argsort(tails, kind='stable')
+    indptr = np.searchsorted(tails[order], np.arange(n_nodes + 1))
+    targets = heads[order]
+
+    seen = np.zeros(n_nodes, dtype=bool)
+    seen[start] = True
+    frontier = np.array([start], dtype=np.int64)
+    while frontier.size:
+        starts, lengths = indptr[frontier], indptr[frontier + 1] - indptr[frontier]
+        # Positions of all out-edges of the frontier, concatenated
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        frontier = np.unique(targets[positions])
+        frontier = frontier[~seen[frontier]]
+        seen[frontier] = True
+
+    return seen
+
+
+class RandomWalkPaths(PathProvider):
+    '''Samples source-to-sink paths on demand with random walks.
+
+    Only edges with capacity between nodes that are reachable (over such
+    edges) from the source and can still reach the sink are walked, so on a DAG every walk ends at the sink. On a
+    graph with cycles a walk that gets stuck (or exceeds `max_length` edges) is
+    simply restarted.
+    '''
+
+    def __init__(self, G, source, target, state, max_length=None, max_restarts=1000):
+        super().__init__(state)
+        self.source = source
+        self.target = target
+        self.max_length = max_length
+        self.max_restarts = max_restarts
+
+        # Walk over the state's edge arrays (dense node ids) rather than G,
+        # so this also works for graphs that were never NetworkX graphs
+        # A path over an edge without capacity could carry no flow
+        usable = state.capacity > 0
+        tails, heads = state.tails[usable], state.heads[usable]
+        self._source = state.node_id(source)
+        self._target = state.node_id(target)
+        useful = _reachable(tails, heads, state.n_nodes, self._source) & _reachable(heads, tails, state.n_nodes, self._target)
+        if not useful[self._source]:
+            raise ValueError(f"no path from {source} to {target}")
+
+        # Out-edges of every useful node in CSR layout, in edge id order
+        tails, heads = state.tails, state.heads
+        walkable = np.flatnonzero(usable & useful[tails] & useful[heads] & (tails != self._target))
+        self._out_edges = walkable[np.argsort(tails[walkable], kind='stable')]
+        self._out_heads = heads[self._out_edges]
+        self._indptr = np.searchsorted(tails[self._out_edges], np.arange(state.n_nodes + 1))
+
+    def _walk(self, rng):
+        node = self._source
+        seen = {node}
+        edge_ids = []
+        while node != self._target:
+            start, end = self._indptr[node], self._indptr[node + 1]
+            choices = [(v, e) for v, e in zip(self._out_heads[start:end].tolist(), self._out_edges[start:end].tolist())
+                       if v not in seen]
+            if not choices or (self.max_length and len(edge_ids) >= self.max_length):
+                return None
+            node, edge = rng.choice(choices)
+            seen.add(node)
+            edge_ids.append(edge)
+        return edge_ids
+
+    def draw(self, rng):
+        for _ in range(self.max_restarts):
+            edge_ids = self._walk(rng)
+            if edge_ids:
+                return self._intern(edge_ids)
+        raise RuntimeError(f"no path from {self.source} to {self.target} found in {self.max_restarts} walks")
+
+
+class KShortestPaths(PathProvider):
+    '''A bounded pool of k simple paths, cheapest first by summed 1/capacity.
+
+    Paths come lazily from nx.shortest_simple_paths weighted by 1/capacity, so
+    short paths over high-capacity edges are found first (this favours wide
+    paths, but is not the same as ordering by bottleneck). refill() swaps the
+    pool for the next k paths (starting over once they run out); with
+    `refill_every` set this happens automatically after that many draws.
+    The first pool is only generated by the first draw, so an engine
+    restored from saved state runs Yen's algorithm once, in set_state.
+    Paths that leave the pool are forgotten once they hold no flow, so only
+    the pool and the paths carrying flow stay in memory.
+    '''
+
+    def __init__(self, G, source, target, state, k=64, refill_every=None):
+        super().__init__(state)
+        self.G = G.to_networkx() if hasattr(G, 'to_networkx') else G
+        self.source = source
+        self.target = target
+        self.k = k
+        self.refill_every = refill_every
+        self._draws = 0
+        self._generator = None
+        self._generated = 0  # Paths taken from the current generator
+        self.pool = []
+        self._in_pool = set()
+
+    @staticmethod
+    def _weight(u, v, data):
+        capacity = data.get('capacity', 0)
+        return 1 / capacity if capacity > 0 else None
+
+    def _paths(self):
+        return nx.shortest_simple_paths(self.G, self.source, self.target, weight=self._weight)
+
+    def refill(self):
+        pool = []
+        fresh = False
+        while len(pool) < self.k:
+            if self._generator is None:
+                self._generator = self._paths()
+                self._generated = 0
+                fresh = True
+            node_path = next(self._generator, None)
+            if node_path is None:
+                # Every path has been handed out; start over on the next refill
+                self._generator = None
+                if pool:
+                    break
+                if fresh:
+                    raise RuntimeError(f"no path from {self.source} to {self.target}")
+                continue
+            fresh = False
+            self._generated += 1
+            pool.append(self._intern(self._node_path_ids(node_path)))
+        self.pool = pool
+        self._in_pool = set(pool)
+
+        for path in [path for path in self._edges if path not in self._in_pool and not self.holds_flow(path)]:
+            self._forget(path)
+
+    def _retain(self, path):
+        return path in self._in_pool
+
+    def draw(self, rng):
+        if not self.pool or self.refill_every and self._draws and self._draws % self.refill_every == 0:
+            self.refill()
+        self._draws += 1
+        return rng.choice(self.pool)
+
+    def get_state(self):
+        # The generator itself cannot be saved, but it is deterministic, so
+        # the number of paths taken from it is enough to rebuild it
+        return {
+            'draws': self._draws,
+            'generated': None if self._generator is None else self._generated,
+            'pool': [self._edges[path].tolist() for path in self.pool],
+        }
+
+    def set_state(self, state):
+        self._draws = state['draws']
+        self._generator = None
+        if state['generated'] is not None:
+            self._generator = self._paths()
+            for _ in range(state['generated']):
+                next(self._generator)
+            self._generated = state['generated']
+        self.pool = [self._intern(edge_ids) for edge_ids in state['pool']]
+        self._in_pool = set(self.pool)
+
+
+# Providers by the names SA_PATHS and the CLIs' --paths take; None is SA's
+# default, EnumeratedPaths
+PATH_PROVIDERS = {'enumerated': None, 'random-walk': RandomWalkPaths, 'k-shortest': KShortestPaths}
+
+
+def configured_paths():
+    '''Name of the path provider for the configured network (see
+    graphs.configured_graph).
+
+    SA_PATHS picks one of PATH_PROVIDERS. By default the demo network's paths
+    are enumerated and a network loaded with SA_GRAPH is sampled with random
+    walks, since enumerating every path of a large network is what loading it
+    in bulk avoids.
+    '''
+    name = os.environ.get('SA_PATHS') or ('random-walk' if os.environ.get('SA_GRAPH') else 'enumerated')
+    if name not in PATH_PROVIDERS:
+        raise ValueError(f"SA_PATHS must be one of {', '.join(sorted(PATH_PROVIDERS))}, not {name!r}")
+
+    return name
+
+
+def sample_store(provider, n, rng):
+    '''PathStore of the distinct paths among n draws from provider, for
+    engines that need a fixed set of paths up front (BatchedSA).
+    '''
+    paths = {}
+    for _ in range(n):
+        edge_ids = provider.edges(provider.draw(rng))
+        paths.setdefault(tuple(edge_ids.tolist()), edge_ids)
+
+    return PathStore.from_paths(paths.values(), provider.state.capacity)
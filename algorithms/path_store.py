@@ -0,0 +1,78 @@
+import os
+from array import array
+import networkx as nx
+import numpy as np
+from algorithms.flow_state import index_edges
+
+
+class PathStore:
+    '''Compact, read-only store of a fixed set of paths in CSR layout.
+
+    The edges of path i are edge_ids[offsets[i]:offsets[i + 1]], as edge ids of
+    index_edges(G), and bottleneck[i] is its minimum capacity. The arrays are
+    never written to after construction, so one store can be shared by every
+    SA instance on the same graph, and it can be saved to disk and
+    memory-mapped back in.
+    '''
+
+    FILES = ('edge_ids', 'offsets', 'bottleneck')
+
+    def __init__(self, edge_ids, offsets, bottleneck):
+        self.edge_ids = edge_ids
+        self.offsets = offsets
+        self.bottleneck = bottleneck
+        for values in (self.edge_ids, self.offsets, self.bottleneck):
+            values.setflags(write=False)
+
+    @classmethod
+    def from_paths(cls, paths, capacity):
+        ''' Build a store from an iterable of edge-id sequences. '''
+        edge_ids = array('i')
+        offsets = array('q', [0])
+        for path in paths:
+            edge_ids.extend(path)
+            offsets.append(len(edge_ids))
+
+        edge_ids = np.frombuffer(edge_ids, dtype=np.int32).copy()
+        offsets = np.frombuffer(offsets, dtype=np.int64).copy()
+        if len(edge_ids):
+            bottleneck = np.minimum.reduceat(np.asarray(capacity)[edge_ids], offsets[:-1])
+        else:
+            bottleneck = np.zeros(0, dtype=np.int64)
+
+        return cls(edge_ids, offsets, bottleneck)
+
+    @classmethod
+    def enumerate(cls, G, source, target, cutoff=9, capacity=None):
+        ''' Store every simple source-to-target path of at most `cutoff` edges. '''
+        if hasattr(G, 'to_networkx'):
+            G = G.to_networkx()  # A CompactGraph; its edge ids match the NetworkX view's
+        edges, edge_index = index_edges(G)
+        if capacity is None:
+            capacity = np.array([G[u][v].get('capacity', 0) for u, v in edges], dtype=np.int64)
+        paths = nx.all_simple_edge_paths(G, source=source, target=target, cutoff=cutoff)
+
+        return cls.from_paths(([edge_index[edge] for edge in path] for path in paths), capacity)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def path(self, i):
+        return self.edge_ids[self.offsets[i]:self.offsets[i + 1]]
+
+    @property
+    def nbytes(self):
+        return self.edge_ids.nbytes + self.offsets.nbytes + self.bottleneck.nbytes
+
+    def save(self, directory):
+        # One .npy per array so that load() can memory-map them
+        os.makedirs(directory, exist_ok=True)
+        for name in self.FILES:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        mmap_mode = 'r' if mmap else None
+        arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode) for name in cls.FILES]
+
+        return cls(*arrays)
@@ -0,0 +1,110 @@
+import os
+import struct
+import numpy as np
+
+# One record per SA step
+STEP_DTYPE = np.dtype([
+    ('iteration', np.int64),
+    ('candidate', np.int64),  # Inflow of the proposed move
+    ('accepted', np.int64),  # Inflow of the current state after the step
+    ('temperature', np.float64),
+    ('accepted_move', np.bool_),
+])
+
+# The .npy header is written with a fixed size, so the record count in it can
+# be rewritten in place as the file grows
+_MAGIC = b'\x93NUMPY\x01\x00'
+_HEADER_BYTES = 256
+
+
+def _npy_header(dtype, count):
+    text = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (np.lib.format.dtype_to_descr(dtype), count)
+    length = _HEADER_BYTES - len(_MAGIC) - 2
+    if len(text) + 1 > length:
+        raise ValueError(f"dtype {dtype} does not fit a {_HEADER_BYTES} byte .npy header")
+
+    return _MAGIC + struct.pack('<H', length) + (text.ljust(length - 1) + '\n').encode('latin1')
+
+
+class TrajectoryRecorder:
+    '''Streams the steps of a run into an append-only .npy file.
+
+    Steps are written into a preallocated buffer of `buffer_size` records,
+    which is appended to the file whenever it fills up (and on flush/close),
+    so memory use stays constant however long the run. After every flush the
+    header holds the number of records written, so the file is a valid .npy
+    that load() can memory-map while the run is still going.
+
+        with TrajectoryRecorder('run.npy') as recorder:
+            sa.attach(recorder)
+            ...
+        steps = TrajectoryRecorder.load('run.npy')
+        steps['accepted'], steps['temperature'], ...
+
+    A run restored from a checkpoint continues its recording with
+    TrajectoryRecorder('run.npy', resume_at=sa.iteration): records of steps
+    from that one on (left over from the interrupted run) are dropped and
+    the new steps are appended. Steps that were never flushed before the
+    interruption are missing, which the iteration field shows.
+    '''
+
+    def __init__(self, path, buffer_size=65536, resume_at=None):
+        self.path = path
+        self._buffer = np.empty(buffer_size, dtype=STEP_DTYPE)
+        self._fill = 0
+        self.flushed = 0
+        self.iteration = resume_at or 0  # Iteration of the next step recorded
+        if resume_at is None or not os.path.exists(path):
+            self._file = open(path, 'wb')
+            self._file.write(_npy_header(STEP_DTYPE, 0))
+        else:
+            self._file = self._resume(path, resume_at)
+
+    def _resume(self, path, resume_at):
+        existing = np.load(path, mmap_mode='r')
+        if existing.dtype != STEP_DTYPE or existing.offset != _HEADER_BYTES:
+            raise ValueError(f"{path} is not a trajectory recording")
+        self.flushed = int(np.searchsorted(existing['iteration'], resume_at))
+        del existing
+
+        f = open(path, 'r+b')
+        f.truncate(_HEADER_BYTES + self.flushed * STEP_DTYPE.itemsize)
+        f.write(_npy_header(STEP_DTYPE, self.flushed))
+        return f
+
+    def __len__(self):
+        return self.flushed + self._fill
+
+    def record(self, candidate, accepted, temperature, accepted_move):
+        self._buffer[self._fill] = (self.iteration, candidate, accepted, temperature, accepted_move)
+        self._fill += 1
+        self.iteration += 1
+        if self._fill == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        if self._fill:
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(self._buffer[:self._fill].tobytes())
+            self.flushed += self._fill
+            self._fill = 0
+
+        self._file.seek(0)
+        self._file.write(_npy_header(STEP_DTYPE, self.flushed))
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def load(path, mmap=True):
+        ''' The records flushed to path so far, memory-mapped unless mmap is False. '''
+        return np.load(path, mmap_mode='r' if mmap else None)
@@ -0,0 +1,153 @@
+'''Cooling schedules and stopping rules for the SA engine.
+
+A schedule gives the next temperature from the current one (cool), sees
+whether each move was accepted (observe) and is told when the engine reheats
+(reheat). Schedules that keep state expose it through get_state/set_state,
+so SA snapshots and checkpoints resume them exactly.
+
+    sa = SA(G, 12, 0.01, schedule=AdaptiveCooling(0.01, target=0.3),
+            stopping=Stopping(patience=2000, reheat_to=6, max_reheats=3))
+'''
+import math
+
+# The temperature below which a run counts as frozen
+FINAL_T = 0.01
+
+
+class Schedule:
+    def cool(self, T):
+        raise NotImplementedError
+
+    def observe(self, accepted):
+        pass
+
+    def reheat(self, T):
+        pass
+
+    def get_state(self):
+        return {}
+
+    def set_state(self, state):
+        pass
+
+
+class Geometric(Schedule):
+    ''' T <- T * (1 - a): the engine's original schedule. '''
+
+    def __init__(self, a):
+        self.a = a
+
+    def cool(self, T):
+        return T*(1-self.a)
+
+    def get_state(self):
+        return {'a': self.a}
+
+    def set_state(self, state):
+        self.a = state['a']
+
+
+class Logarithmic(Schedule):
+    '''T_k = T0 / (1 + c * ln(1 + k)) for the k-th step since the start or last reheat.
+
+    Cools very slowly; it reaches FINAL_T only after an astronomical number
+    of steps, so use it with a Stopping budget or patience.
+    '''
+
+    def __init__(self, c=1.0):
+        self.c = c
+        self.T0 = None
+        self.k = 0
+
+    def cool(self, T):
+        if self.T0 is None:
+            self.T0 = T
+        self.k += 1
+        return self.T0 / (1 + self.c * math.log(1 + self.k))
+
+    def reheat(self, T):
+        self.T0 = T
+        self.k = 0
+
+    def get_state(self):
+        return {'T0': self.T0, 'k': self.k}
+
+    def set_state(self, state):
+        self.T0 = state['T0']
+        self.k = state['k']
+
+
+class LundyMees(Schedule):
+    ''' T <- T / (1 + beta * T): fast while hot, slowing down as it freezes. '''
+
+    def __init__(self, beta):
+        self.beta = beta
+
+    def cool(self, T):
+        return T / (1 + self.beta*T)
+
+
+class AdaptiveCooling(Geometric):
+    '''Geometric cooling whose rate follows the acceptance rate.
+
+    Every `window` steps the fraction of accepted moves is compared with
+    `target`: above it the system is still hot and the rate a is multiplied by
+    `adjust`, below it a is divided by it, within [min_a, max_a].
+    '''
+
+    def __init__(self, a, target=0.3, window=100, adjust=1.5, min_a=None, max_a=None):
+        self.a = a
+        self.target = target
+        self.window = window
+        self.adjust = adjust
+        self.min_a = min_a if min_a is not None else a / 100
+        self.max_a = max_a if max_a is not None else min(0.5, a * 100)
+        self.accepted = 0
+        self.count = 0
+
+    def observe(self, accepted):
+        self.accepted += accepted
+        self.count += 1
+        if self.count == self.window:
+            if self.accepted / self.count > self.target:
+                self.a = min(self.a * self.adjust, self.max_a)
+            else:
+                self.a = max(self.a / self.adjust, self.min_a)
+            self.accepted = self.count = 0
+
+    def get_state(self):
+        return {'a': self.a, 'accepted': self.accepted, 'count': self.count}
+
+    def set_state(self, state):
+        self.a = state['a']
+        self.accepted = state['accepted']
+        self.count = state['count']
+
+
+SCHEDULES = {
+    'geometric': Geometric,
+    'logarithmic': Logarithmic,
+    'lundy-mees': LundyMees,
+    'adaptive': AdaptiveCooling,
+}
+
+
+class Stopping:
+    '''When a run ends, besides freezing below final_T.
+
+    patience: stop after that many steps without a new best inflow; with
+        reheat_to set, first reheat to that temperature up to max_reheats
+        times, and only stop once they are used up.
+    max_steps: stop after that many steps in total.
+    time_budget: stop after that many seconds of stepping (per process; a
+        resumed run starts its clock again).
+    '''
+
+    def __init__(self, patience=None, max_steps=None, time_budget=None, reheat_to=None, max_reheats=0,
+                 final_T=FINAL_T):
+        self.patience = patience
+        self.max_steps = max_steps
+        self.time_budget = time_budget
+        self.reheat_to = reheat_to
+        self.max_reheats = max_reheats
+        self.final_T = final_T
@@ -1,176 +1,551 @@
-import networkx as nx
+import json
+import os
+import tempfile
+import time
+import numpy as np
 import random
 import math
+from algorithms.flow_state import FlowState
+from algorithms.graphs import graph_fingerprint, terminals
+from algorithms.instrumentation import Instrumentation
+from algorithms.path_providers import EnumeratedPaths
+from algorithms.schedules import Geometric, Stopping
+
+# Bump whenever a change alters the trajectory produced for a given seed,
+# so cached trajectories from older engines are not reused
+ENGINE_VERSION = 2
 
 class SA:
-    def __init__(self, G, T, a):
-        self.G = G
-        self.source = 0
-        self.target = max(G.nodes)
-        self.all_paths = list(nx.all_simple_edge_paths(G, source=self.source, target=self.target, cutoff=9))
+    def __init__(self, G, T, a, paths=None, path_store=None, debug=False, seed=None, source=None, target=None,
+                 schedule=None, stopping=None):
+        # G is a NetworkX graph, or a CompactGraph from algorithms.graph_loader,
+        # whose own source and sink are the defaults. The NetworkX default
+        # is the demo network's convention: node 0 to the largest node.
+        compact = hasattr(G, 'to_networkx')
+        self.source, self.target = terminals(G, source, target)
         self.visited_paths = set()
         self.T = T  # Initial temperature
         self.a = a
-        self.max_inflow = 0 
+        self.max_inflow = 0
+        self.best_inflow = 0
+        self.debug = debug  # Cross-check the incremental objective on every move
+
+        # Each instance owns its generator, so concurrent runs don't interfere
+        self.rng = random.Random(seed)
+
+        # Capacities and flows live in flat arrays indexed by edge id;
+        # a NetworkX graph is only built when someone asks for self.G.
+        # The inflow into the (fixed) sink is maintained incrementally.
+        if compact:
+            self.state = FlowState.from_arrays(G.tails, G.heads, G.capacity, G.flow, sink=self.target, n_nodes=G.n_nodes)
+        else:
+            self.state = FlowState(G, sink=self.target)
+
+        # Where candidate paths come from; enumerating every simple path is
+        # exact but only feasible on small networks (see path_providers).
+        # A prebuilt PathStore can be shared between instances on the same graph.
+        if paths is None:
+            self.paths = EnumeratedPaths(G, self.source, self.target, self.state, store=path_store)
+        else:
+            self.paths = paths(G, self.source, self.target, self.state)
+        self.paths.holds_flow = lambda path: path in self.visited_paths
+
+        # Inverted index from edge id to the visited path using it (-1 if none).
+        # Visited paths never share an edge, so one owner per edge is enough.
+        self._edge_owner = np.full(len(self.state), -1, dtype=np.int64)
+
+        # Journal of (path, added) changes to visited_paths made by the
+        # pending move, replayed backwards if the move is rejected
+        self._journal = []
+        self._graph = None
+
+        # Optional TrajectoryRecorder that every step is written to (see attach)
+        self.recorder = None
+        # Per-phase timers and counters, only while instrumented (see instrument)
+        self.instrumentation = None
+
+        # Periodic checkpointing, only when enabled (see autosave)
+        self._autosave = None
+
+        # How the temperature falls and when the run ends (see algorithms/schedules.py);
+        # by default geometric cooling at rate a until the run freezes
+        self.schedule = schedule if schedule is not None else Geometric(a)
+        self.stopping = stopping if stopping is not None else Stopping()
+        self.iteration = 0
+        self.reheats = 0
+        self.stop_reason = None  # Stays None when the run just freezes
+        self._since_improvement = 0
+        self._clock_start = None
 
         # Save initial state params ( for reset function)
         self.init_graph = G  # Save the original graph to reset later
         self.init_temp = T
-        self.init_max_inflow = 0 
+        self.init_max_inflow = 0
         self.init_visited_paths = set()
+        self.init_flow = self.state.flow.copy()
+        self.init_seed = seed
+        self._fingerprint = None  # graph_fingerprint(G), computed on the first checkpoint
+        self.init_schedule_state = self.schedule.get_state()
+        self.init_provider_state = self.paths.get_state()
+
+    @property
+    def G(self):
+        ''' NetworkX view of the current flows, rebuilt only after they change. '''
+        if self._graph is None:
+            self._graph = self.state.to_graph()
+        return self._graph
+
+    @property
+    def all_paths(self):
+        # Only providers that enumerate up front have a full path list
+        return self.paths.all_paths
+
+    @property
+    def flow(self):
+        return self.state.flow
+
+    @property
+    def running(self):
+        ''' False once the run has frozen or a stopping rule has ended it. '''
+        return self.stop_reason is None and self.T >= self.stopping.final_T
+
+    def seed(self, seed):
+        self.rng.seed(seed)
+
+    def get_rng_state(self):
+        return self.rng.getstate()
+
+    def set_rng_state(self, state):
+        self.rng.setstate(state)
+
+    def get_state(self):
+        '''Compact, picklable snapshot of a run between steps.
+
+        Only plain numbers, NumPy arrays and the provider's own (JSON-able)
+        state are stored; the graph is not, so the snapshot can be restored
+        (with from_state) in any process that has the same graph. The edges
+        of every visited path are kept with its id, so providers that number
+        paths as they meet them (RandomWalkPaths, KShortestPaths) restore too.
+        '''
+        version, internal, gauss_next = self.rng.getstate()
+        visited_paths = sorted(self.visited_paths)
+        visited = [self.paths.edges(p) for p in visited_paths]
+        offsets = np.zeros(len(visited) + 1, dtype=np.int64)
+        np.cumsum([len(edges) for edges in visited], out=offsets[1:])
+
+        return {
+            'T': self.T,
+            'a': self.a,
+            'max_inflow': self.max_inflow,
+            'best_inflow': self.best_inflow,
+            'flow': self.state.flow.copy(),
+            'visited_paths': np.array(visited_paths, dtype=np.int64),
+            'visited_edges': np.concatenate(visited) if visited else np.zeros(0, dtype=np.int64),
+            'visited_offsets': offsets,
+            'provider': self.paths.get_state(),
+            'rng_state': (version, np.array(internal, dtype=np.uint32), gauss_next),
+            'control': self._control_state(),
+        }
+
+    def _control_state(self):
+        # Where the run is in its schedule and stopping rules
+        return {
+            'iteration': self.iteration,
+            'reheats': self.reheats,
+            'since_improvement': self._since_improvement,
+            'stop_reason': self.stop_reason,
+            'schedule': self.schedule.get_state(),
+        }
+
+    def set_state(self, state):
+        self.T = state['T']
+        self.a = state['a']
+        self.max_inflow = state['max_inflow']
+        self.best_inflow = state['best_inflow']
+
+        self.state.flow[:] = state['flow']
+        self.state.inflow = self.state.sink_inflow()
+        self.state.commit()
+
+        # Map the saved path ids onto the ids this engine's provider uses,
+        # then rebuild the visited set and its edge owner index. Snapshots
+        # from before paths were saved with their edges keep their ids.
+        if state.get('provider') is not None:
+            self.paths.set_state(state['provider'])
+        edges = state.get('visited_edges')
+        offsets = state['visited_offsets'].tolist() if edges is not None else None
+        self._clear_visited()
+        for i, saved in enumerate(state['visited_paths'].tolist()):
+            path = saved if edges is None else self.paths.restore(saved, edges[offsets[i]:offsets[i + 1]])
+            self.visited_paths.add(path)
+            self._edge_owner[self.paths.edges(path)] = path
+        self._journal.clear()
+        self._graph = None
+
+        version, internal, gauss_next = state['rng_state']
+        self.rng.setstate((version, tuple(internal.tolist()), gauss_next))
+
+        # Snapshots from before schedules were pluggable have no control state
+        control = state.get('control')
+        if control is not None:
+            self.iteration = control['iteration']
+            self.reheats = control['reheats']
+            self._since_improvement = control['since_improvement']
+            self.stop_reason = control['stop_reason']
+            self.schedule.set_state(control['schedule'])
+
+    @classmethod
+    def from_state(cls, G, state, **kwargs):
+        ''' Rebuild an engine on G from a get_state() snapshot. '''
+        sa = cls(G, state['T'], state['a'], **kwargs)
+        sa.set_state(state)
+
+        return sa
+
+    def save_checkpoint(self, path):
+        '''Write the run so far to an .npz file that from_checkpoint resumes.
+
+        This is get_state() (including the path provider's own state, so runs
+        on KShortestPaths' pool resume too) plus a fingerprint of the graph.
+        The file is written under a temporary name and renamed into place, so
+        a crash mid-write leaves the previous checkpoint intact.
+        '''
+        if self._fingerprint is None:
+            self._fingerprint = graph_fingerprint(self.init_graph)
+        state = self.get_state()
+        version, internal, gauss_next = state['rng_state']
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f,
+                     engine_version=ENGINE_VERSION,
+                     T=state['T'],
+                     a=state['a'],
+                     max_inflow=state['max_inflow'],
+                     best_inflow=state['best_inflow'],
+                     flow=state['flow'],
+                     visited_paths=state['visited_paths'],
+                     visited_edges=state['visited_edges'],
+                     visited_offsets=state['visited_offsets'],
+                     rng_version=version,
+                     rng_internal=internal,
+                     rng_gauss=np.nan if gauss_next is None else gauss_next,
+                     control=json.dumps(state['control']),
+                     provider=json.dumps(state['provider']),
+                     fingerprint=self._fingerprint)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_checkpoint(cls, G, path, **kwargs):
+        '''Resume a run saved with save_checkpoint on the same graph.
+
+        kwargs are passed to the constructor and must choose the same path
+        provider (and source and sink) as the saved run; the run then
+        continues exactly as it would have without the interruption. A
+        checkpoint of another graph is refused with a ValueError.
+        '''
+        fingerprint = graph_fingerprint(G)
+        with np.load(path) as data:
+            if int(data['engine_version']) != ENGINE_VERSION:
+                raise ValueError(f"checkpoint {path} is from engine version {int(data['engine_version'])}, "
+                                 f"not {ENGINE_VERSION}")
+            if str(data['fingerprint']) != fingerprint:
+                raise ValueError(f"checkpoint {path} was saved on a different graph")
+            gauss_next = float(data['rng_gauss'])
+            state = {
+                'T': float(data['T']),
+                'a': float(data['a']),
+                'max_inflow': int(data['max_inflow']),
+                'best_inflow': int(data['best_inflow']),
+                'flow': data['flow'],
+                'rng_state': (int(data['rng_version']), data['rng_internal'],
+                              None if math.isnan(gauss_next) else gauss_next),
+                'control': json.loads(str(data['control'])),
+                'visited_paths': data['visited_paths'],
+                'visited_edges': data['visited_edges'],
+                'visited_offsets': data['visited_offsets'],
+                'provider': json.loads(str(data['provider'])),
+            }
+
+        sa = cls(G, state['T'], state['a'], **kwargs)
+        sa._fingerprint = fingerprint
+        if len(state['flow']) != len(sa.state):
+            raise ValueError(f"checkpoint {path} has {len(state['flow'])} edges, the graph has {len(sa.state)}")
+        sa.set_state(state)
+
+        return sa
+
+    def autosave(self, path, every=10000, seconds=None):
+        '''From now on save a checkpoint to path every `every` steps, or every
+        `seconds` of wall time if given; path=None stops. The check is one
+        comparison per step.
+        '''
+        if path is None:
+            self._autosave = None
+            return
+        self._autosave = {'path': path, 'every': every, 'seconds': seconds,
+                          'steps': 0, 'last': time.monotonic()}
+
+    def _autosave_tick(self):
+        autosave = self._autosave
+        autosave['steps'] += 1
+        if autosave['seconds'] is not None:
+            due = time.monotonic() - autosave['last'] >= autosave['seconds']
+        else:
+            due = autosave['steps'] >= autosave['every']
+        if due:
+            self.save_checkpoint(autosave['path'])
+            autosave['steps'] = 0
+            autosave['last'] = time.monotonic()
+
+    def attach(self, recorder):
+        ''' Record every following step into recorder (see algorithms/recorder.py); None detaches. '''
+        self.recorder = recorder
+
+    def instrument(self, hook=None):
+        '''Start timing and counting the phases of every step.
+
+        Returns the Instrumentation collecting them (see
+        algorithms/instrumentation.py); hook, if given, is called as
+        hook(phase, seconds) after each timed call. Uninstrumented engines
+        pay nothing for this.
+        '''
+        if self.instrumentation is not None:
+            self.uninstrument()
+        self.instrumentation = Instrumentation(hook)
+        self.instrumentation.attach(self)
+
+        return self.instrumentation
+
+    def uninstrument(self):
+        if self.instrumentation is not None:
+            self.instrumentation.detach(self)
+            self.instrumentation = None
 
     def _init_G(self):
         # Set all flow values in graph to 0
-        for u, v in self.G.edges():
-            self.G[u][v]['flow'] = 0
+        self.state.zero()
+        self._graph = None
 
     def _select_path(self):
-        # select a random path from the list of paths from source to sink
-        path = random.choice(self.all_paths)
+        # select a random path from source to sink (as a path id of self.paths)
+        path = self.paths.draw(self.rng)
 
         return path
 
     def _get_min_capacity(self, path):
         # get the minimum capacity of the path
-        min_capacity = math.inf
-        for edge in path:
-            if self.G[edge[0]][edge[1]]['capacity'] < min_capacity:
-                min_capacity = self.G[edge[0]][edge[1]]['capacity']
-
-        return min_capacity
+        return self.paths.min_capacity(path)
 
-    def _heuristic(self, G):
-        '''The heuristic calculates the inflow into the sink node
-        of the given graph
+    def _heuristic(self):
+        '''The heuristic is the inflow into the sink node of the current
+        flow state. It is updated as edge flows change, so this is O(1);
+        in debug mode it is checked against a full recompute.
         '''
 
-        sink = max(G.nodes)
-        total_inflow = 0
+        inflow = self.state.inflow
+        if self.debug and inflow != self.state.sink_inflow():
+            raise AssertionError(f"incremental inflow {inflow} != recomputed {self.state.sink_inflow()}")
+
+        return inflow
 
-        # Calculate the total flow into the sink node
-        for predecessor in G.predecessors(sink):
-            total_inflow += G[predecessor][sink]['flow']
+    def _zero_out_flow(self, path):
+        self.state.set_flow(self.paths.edges(path), 0)
 
-        return total_inflow
+    def _visit(self, path):
+        self.visited_paths.add(path)
+        self._journal.append((path, True))
+        self.state.assign(self._edge_owner, self.paths.edges(path), path)
 
-    def _zero_out_flow(self, G, path):
-        for edge in path:
-            G[edge[0]][edge[1]]['flow'] = 0
+    def _evict(self, path):
+        self._zero_out_flow(path)
+        self.state.assign(self._edge_owner, self.paths.edges(path), -1)
+        self.visited_paths.remove(path)
+        self._journal.append((path, False))
 
-    def _enforce_conservation(self, G, curr_path):
+    def _enforce_conservation(self, curr_path):
 
         '''This will make sure each edge in a path that also contains an edge in the
          currently selected path will be 0'd out before updating the flow values
          in the current path. By zeroing out all edges in a path that is jointed
          with the current path, we guarantee that conservation will be maintained
          for the new flow values of the current path.
-        '''
-
-        # Iterate over a shallow copy of visited_paths
-        # (since visited_paths will be changed as we iterate)
-        for v_path in list(self.visited_paths):
-            # Create sets of edges for both paths
-            curr_path_edges = set(curr_path)
-            v_path_edges = set(v_path)
-
-            # Check for intersection
-            if not curr_path_edges.isdisjoint(v_path_edges):
-                # Zero out all edges if there is an edge intersection
-                # print(f"erasing: {v_path}")
-                self._zero_out_flow(G, v_path)
-                self.visited_paths.remove(v_path)
 
+         Overlapping paths are found through the edge owner index, so the cost
+         depends only on the edges of the current and evicted paths.
+        '''
 
+        owners = self._edge_owner[self.paths.edges(curr_path)]
+        for v_path in np.unique(owners[owners >= 0]).tolist():
+            # Zero out all edges of any visited path sharing an edge
+            self._evict(v_path)
 
     def _successor(self):
-        '''This will determine the edge flows of a new graph at each iteration of the
-        simulated annealing algorithm
+        '''This will apply a candidate move to the flow state at each iteration of the
+        simulated annealing algorithm. The move is recorded in the state's undo log
+        so that it can be rolled back with _reject() if it is not accepted.
         '''
-        # copy G so we don't update the existing graph
-        temp_G = self.G.copy()
-
         # Randomly select a path
         curr_path = self._select_path()
         min_capacity = self._get_min_capacity(curr_path)
 
         # Select random flow value for this path
-        flow = random.randint(1, min_capacity)
+        flow = self.rng.randint(1, min_capacity)
 
         # Before updating flow values, make sure conservation will be maintained
-        self._enforce_conservation(temp_G, curr_path)
+        self._enforce_conservation(curr_path)
         # Add this path to visited
-        self.visited_paths.add(tuple(curr_path))
-
+        self._visit(curr_path)
 
         # Set each edge to the flow value
-        for edge in curr_path:
-            temp_G[edge[0]][edge[1]]['flow'] = flow
+        self._apply_flow(curr_path, flow)
 
-        return temp_G, self._heuristic(temp_G)
+        return self._heuristic()
 
-    def step(self):
-        ''' Perform a single iteration of the simulated annealing algorithm. '''
-        if self.T < 0.01:  # Stop if temperature is very low
-            return 0, self.max_inflow, self.G, 0
-        
-        # Temperature dissipation
-        self.T = self.T*(1-self.a)
-        visited_paths_state = self.visited_paths.copy()
-
-        # Store new graph and inflow value from the successor function
-        curr_G, curr_inflow = self._successor()
-
-        # Acceptance condition
-        if curr_inflow < self.max_inflow:
-            E = curr_inflow - self.max_inflow
-            acceptance_threshold = math.exp(E / self.T)
-            p = random.uniform(0, 1)
-            if p < acceptance_threshold:
-                self.max_inflow = curr_inflow
-                self.G = curr_G
+    def _apply_flow(self, path, flow):
+        self.state.set_flow(self.paths.edges(path), flow)
+
+    def _accept(self):
+        self.state.commit()
+        self._release_unvisited()
+        self._graph = None
+
+    def _reject(self):
+        # The rollback also restores the edge owner index
+        self.state.rollback()
+        for path, added in reversed(self._journal):
+            if added:
+                self.visited_paths.remove(path)
             else:
-                self.visited_paths = visited_paths_state
-        else:
+                self.visited_paths.add(path)
+        self._release_unvisited()
+
+    def _clear_visited(self):
+        # Empty the visited set, letting the provider forget those paths
+        visited, self.visited_paths = self.visited_paths, set()
+        self._edge_owner[:] = -1
+        for path in visited:
+            self.paths.release(path)
+
+    def _release_unvisited(self):
+        # Paths the move touched that hold no flow now can be forgotten by
+        # providers that sample paths on demand
+        for path, _ in self._journal:
+            if path not in self.visited_paths:
+                self.paths.release(path)
+        self._journal.clear()
+
+    def _acceptance_test(self, curr_inflow, T):
+        # Always accept a better (or equal) inflow; accept a worse one
+        # with probability exp(E / T)
+        if curr_inflow >= self.max_inflow:
+            return True
+        E = curr_inflow - self.max_inflow
+        acceptance_threshold = math.exp(E / T)
+        p = self.rng.uniform(0, 1)
+
+        return p < acceptance_threshold
+
+    def _metropolis(self, T):
+        ''' Propose a move and accept or reject it at temperature T. '''
+        # Apply a candidate move and get its inflow value from the successor function
+        curr_inflow = self._successor()
+
+        accepted = self._acceptance_test(curr_inflow, T)
+        if accepted:
             self.max_inflow = curr_inflow
-            self.G = curr_G
+            self._accept()
+        else:
+            self._reject()
 
-        return curr_inflow, self.max_inflow, self.G, self.T
+        self.schedule.observe(accepted)
+        if self.max_inflow > self.best_inflow:
+            self.best_inflow = self.max_inflow
+            self._since_improvement = 0
+        else:
+            self._since_improvement += 1
+
+        if self.recorder is not None:
+            self.recorder.record(curr_inflow, self.max_inflow, T, accepted)
+
+        return curr_inflow
+
+    def step(self):
+        ''' Perform a single iteration of the simulated annealing algorithm.
+
+        Returns the candidate inflow, the accepted inflow, the edge flow vector
+        (indexed like self.state.edges) and the temperature.
+        '''
+        if not self.running:  # Frozen, or stopped early
+            return 0, self.max_inflow, self.flow, 0
+        if self._clock_start is None:
+            self._clock_start = time.perf_counter()  # The time budget counts the first step too
+
+        # Temperature dissipation
+        self.T = self.schedule.cool(self.T)
+        curr_inflow = self._metropolis(self.T)
+        self.iteration += 1
+        self._check_stopping()
+
+        if self._autosave is not None:
+            self._autosave_tick()
+
+        return curr_inflow, self.max_inflow, self.flow, self.T
+
+    def _check_stopping(self):
+        stopping = self.stopping
+        if stopping.patience is not None and self._since_improvement >= stopping.patience:
+            if stopping.reheat_to is not None and self.reheats < stopping.max_reheats:
+                # Stuck: heat up again and let the schedule start over from there
+                self.reheats += 1
+                self._since_improvement = 0
+                self.T = stopping.reheat_to
+                self.schedule.reheat(self.T)
+            else:
+                self.stop_reason = 'patience'
+        if stopping.max_steps is not None and self.iteration >= stopping.max_steps:
+            self.stop_reason = 'max_steps'
+        if stopping.time_budget is not None and time.perf_counter() - self._clock_start >= stopping.time_budget:
+            self.stop_reason = 'time_budget'
 
     def simulated_annealing(self, T, a):
+        ''' Anneal from an empty flow at temperature T until the run ends; returns the final inflow and graph.
+
+        a is the rate of the default geometric schedule; other schedules keep their own.
+        '''
         self._init_G()
-        max_inflow = 0
-
-        # Loop until T is approx. 0 since T will never actually hit 0.
-        while T > 0.01:
-            # Temperature dissapates on each iteration
-            T = T*(1-a)
-            visited_paths_state = self.visited_paths.copy()
-
-            # Store the new graph and its inflow value according to successor function
-            curr_G, curr_inflow = self._successor()
-
-            # If the new inflow is worse than the current max, accept it anyway
-            # with a certain probability
-            if curr_inflow < max_inflow:
-                E = curr_inflow - max_inflow
-                acceptance_threshold = math.exp(E / T)
-                p = random.uniform(0, 1)
-
-                if p < acceptance_threshold:
-                    max_inflow = curr_inflow
-                    self.G = curr_G   # update graph
-                else:
-                    self.visited_paths = visited_paths_state
-
-            # If the new inflow is better, always accept it
-            else:
-                max_inflow = curr_inflow
-                self.G = curr_G  # update graph
+        self.T = T
+        self.a = a
+        # Each call is a fresh run: the schedule starts over and patience
+        # is measured against this run's best only
+        self.schedule.set_state(self.init_schedule_state)
+        if type(self.schedule) is Geometric:
+            self.schedule.a = a
+        self.max_inflow = self.best_inflow = 0
+        self._clear_visited()
+        self.iteration = self.reheats = self._since_improvement = 0
+        self.stop_reason = self._clock_start = None
+
+        while self.running:
+            self.step()
+
+        return self.max_inflow, self.G
 
-        return max_inflow, self.G
-    
     def reset(self):
-        self.G = self.init_G
+        ''' Return to the state the engine was constructed in, reseeded with the same seed. '''
         self.T = self.init_temp
         self.max_inflow = self.init_max_inflow
-        self.visited_paths = self.init_visited_paths
\ No newline at end of file
+        self.best_inflow = 0
+        self.state.flow[:] = self.init_flow
+        self.state.inflow = self.state.sink_inflow()
+        self.state.commit()
+        self._clear_visited()
+        self.visited_paths = set(self.init_visited_paths)
+        self._journal.clear()
+        self._graph = None
+        self.rng.seed(self.init_seed)
+        self.schedule.set_state(self.init_schedule_state)
+        self.paths.set_state(self.init_provider_state)
+        self.iteration = self.reheats = self._since_improvement = 0
+        self.stop_reason = self._clock_start = None
@@ -0,0 +1,121 @@
+'''Parameter sweeps of the SA engine over (seed, initial temperature, cooling rate).
+
+Configurations run in a process pool. The graph and its PathStore (or the
+path provider, see path_providers) are sent to each worker once, when the
+worker starts, and results are yielded as soon as each configuration
+finishes. The CLI runs on the configured network and path provider (see
+graphs.configured_graph and path_providers.configured_paths).
+
+    python -m algorithms.sweep --seeds 1 2 3 --temps 12 50 --rates 0.2 0.05
+    python -m algorithms.sweep --samples 100 --output sweep.csv
+'''
+import argparse
+import csv
+import itertools
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from algorithms.graphs import configured_graph, terminals
+from algorithms.path_providers import PATH_PROVIDERS, configured_paths
+from algorithms.path_store import PathStore
+from algorithms.simulated_annealing import SA
+
+COLUMNS = ['seed', 'T', 'a', 'final_inflow', 'best_inflow', 'iterations', 'wall_time']
+
+# Set once per worker process by _init_worker
+_graph = None
+_path_store = None
+_paths = None
+_terminals = None
+
+
+def parameter_grid(seeds, temperatures, cooling_rates):
+    ''' Every combination of the given seeds, temperatures and cooling rates. '''
+    return [{'seed': seed, 'T': T, 'a': a} for seed, T, a in itertools.product(seeds, temperatures, cooling_rates)]
+
+
+def random_configs(n, temperature_range=(1, 100), cooling_rate_range=(0.01, 0.99), seed=None):
+    ''' n configurations with temperatures and cooling rates drawn uniformly from the ranges. '''
+    rng = random.Random(seed)
+    return [{'seed': rng.randrange(2**31),
+             'T': rng.uniform(*temperature_range),
+             'a': rng.uniform(*cooling_rate_range)} for _ in range(n)]
+
+
+def _init_worker(G, path_store, paths, source, target):
+    global _graph, _path_store, _paths, _terminals
+    _graph = G
+    _path_store = path_store
+    _paths = paths
+    _terminals = source, target
+
+
+def run_config(config):
+    ''' Anneal once with the given configuration and summarise the run. '''
+    start = time.perf_counter()
+    source, target = _terminals
+    sa = SA(_graph, config['T'], config['a'], path_store=_path_store, paths=_paths, seed=config['seed'], source=source, target=target)
+
+    iterations = 0
+    while sa.running:
+        sa.step()
+        iterations += 1
+
+    return dict(config,
+                final_inflow=sa.max_inflow,
+                best_inflow=sa.best_inflow,
+                iterations=iterations,
+                wall_time=time.perf_counter() - start)
+
+
+def sweep(G, configs, processes=None, source=None, target=None, paths=None):
+    '''Run every configuration on G across a process pool.
+
+    G is a NetworkX graph or a CompactGraph, with SA's defaults for source and
+    target; paths is a provider factory as for SA, and only with the default
+    (enumerated paths) is a PathStore built. This is a generator: rows (see
+    COLUMNS) are yielded in completion order, not submission order.
+    '''
+    source, target = terminals(G, source, target)
+    path_store = PathStore.enumerate(G, source, target) if paths is None else None
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(G, path_store, paths, source, target)) as pool:
+        futures = [pool.submit(run_config, config) for config in configs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep SA over seed, initial temperature and cooling rate.")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[5])
+    parser.add_argument("--temps", type=float, nargs="+", default=[12])
+    parser.add_argument("--rates", type=float, nargs="+", default=[0.2])
+    parser.add_argument("--samples", type=int, help="draw this many random configurations instead of a grid")
+    parser.add_argument("--sample-seed", type=int)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--paths", choices=sorted(PATH_PROVIDERS), help="path provider (default: SA_PATHS)")
+    parser.add_argument("--output", help="CSV file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.samples:
+        configs = random_configs(args.samples, seed=args.sample_seed)
+    else:
+        configs = parameter_grid(args.seeds, args.temps, args.rates)
+
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        writer = csv.DictWriter(out, fieldnames=COLUMNS)
+        writer.writeheader()
+        G, source, sink = configured_graph()
+        paths = PATH_PROVIDERS[args.paths or configured_paths()]
+        for row in sweep(G, configs, args.processes, source, sink, paths):
+            writer.writerow(row)
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
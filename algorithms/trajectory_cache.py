@@ -0,0 +1,111 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+from algorithms.simulated_annealing import ENGINE_VERSION
+
+
+class TrajectoryCache:
+    '''Two-tier cache of precomputed inflow trajectories.
+
+    Entries are keyed by (graph fingerprint, seed, T, a, engine version) and
+    the kind of trajectory recorded. The first tier is an in-memory LRU of at
+    most `max_entries` trajectories; the optional second tier stores one .npy
+    file per entry under `directory`, survives restarts, and drops the least
+    recently used files once their total size exceeds `max_bytes`. Hit and
+    miss counters are kept in self.stats.
+    '''
+
+    def __init__(self, max_entries=128, directory=None, max_bytes=256 * 2**20):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(fingerprint, seed, T, a, kind='inflow'):
+        return f"{kind}-{fingerprint}-{seed}-{float(T)!r}-{float(a)!r}-v{ENGINE_VERSION}"
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, key):
+        with self._lock:
+            trajectory = self._memory.get(key)
+            if trajectory is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return trajectory
+
+        if self.directory:
+            path = self._path(key)
+            try:
+                trajectory = np.load(path)
+                os.utime(path)  # mark as recently used for eviction
+            except (FileNotFoundError, ValueError, OSError):
+                trajectory = None
+            if trajectory is not None:
+                with self._lock:
+                    self.stats['disk_hits'] += 1
+                self._remember(key, trajectory)
+                return trajectory
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def set(self, key, trajectory):
+        trajectory = np.asarray(trajectory)
+        self._remember(key, trajectory)
+
+        if self.directory:
+            # Write to a temporary file first so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, trajectory)
+            os.replace(tmp_path, self._path(key))
+            self._evict_disk()
+
+    def get_or_compute(self, key, compute):
+        ''' Return the cached trajectory for key, computing and storing it on a miss. '''
+        trajectory = self.get(key)
+        if trajectory is None:
+            trajectory = np.asarray(compute())
+            self.set(key, trajectory)
+
+        return trajectory
+
+    def _remember(self, key, trajectory):
+        with self._lock:
+            self._memory[key] = trajectory
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npy'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self.stats['evictions'] += 1
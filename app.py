@@ -1,3 +1,4 @@
+import uuid
 import dash
 from dash import dcc, html
 from dash.dependencies import Input, Output
@@ -38,19 +39,23 @@ tab_selected_style = {
     'padding':'6px'
 }
 
-app.layout = html.Div([
-    dcc.Tabs(id="tabs-styled-with-inline", value='sa', children=[
-        dcc.Tab(label='Simulated Annealing', value='sa', style=tab_style, selected_style=tab_selected_style),
-        dcc.Tab(label='Additional Visualization', value='tab-2', style=tab_style, selected_style=tab_selected_style),
-    ], style=tabs_styles),
+def serve_layout():
+    # Called on every page load, so each browser session gets its own id
+    return html.Div([
+        dcc.Tabs(id="tabs-styled-with-inline", value='sa', children=[
+            dcc.Tab(label='Simulated Annealing', value='sa', style=tab_style, selected_style=tab_selected_style),
+            dcc.Tab(label='Additional Visualization', value='tab-2', style=tab_style, selected_style=tab_selected_style),
+        ], style=tabs_styles),
     
 
-    # Content container with layouts for both tabs, controlled by CSS visibility
-    html.Div([
-        html.Div(create_layout_sa(), id='sa-content', style={'display': 'block'}),
-        html.Div(additional_tab(), id='tab-2-content', style={'display': 'none'})
-    ], id='tabs-content-inline', style={'padding': '20px'})
-])
+        # Content container with layouts for both tabs, controlled by CSS visibility
+        html.Div([
+            html.Div(create_layout_sa(str(uuid.uuid4())), id='sa-content', style={'display': 'block'}),
+            html.Div(additional_tab(), id='tab-2-content', style={'display': 'none'})
+        ], id='tabs-content-inline', style={'padding': '20px'})
+    ])
+
+app.layout = serve_layout
 
 register_callbacks_sa(app)
 # Toggle visibility based on the active tab
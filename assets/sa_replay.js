@@ -0,0 +1,49 @@
+// Client-side replay of a precomputed simulated annealing run.
+// The server ships the whole run once (see start_replay in
+// callbacks/simulated_annealing.py); each replay-interval tick then
+// advances the chart locally without a server round trip.
+
+// Cap replays at about a minute at the 100 ms interval
+const SA_REPLAY_FRAMES = 600;
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    sa: Object.assign({}, (window.dash_clientside || {}).sa, {
+        replayFrame: function (n_intervals, data) {
+            const no_update = window.dash_clientside.no_update;
+            if (!data || !n_intervals) {
+                return [no_update, no_update, no_update, no_update];
+            }
+
+            const total = data.accepted.length;
+            const perFrame = Math.max(1, Math.ceil(total / SA_REPLAY_FRAMES));
+            const start = (n_intervals - 1) * perFrame;
+            const end = Math.min(total, start + perFrame);
+            if (start >= total) {
+                return [no_update, no_update, no_update, true];
+            }
+
+            const x = [];
+            for (let i = start; i < end; i++) {
+                x.push(i);
+            }
+            const maxInflow = data.accepted[end - 1];
+            const lineEnd = Math.max(data.background_length - 1, 0);
+
+            // Append to the Accepted Inflow trace (2) and replace the two
+            // points of the Max Inflow line (1) by capping it at 2 points
+            const extendData = [
+                {x: [x, [0, lineEnd]], y: [data.accepted.slice(start, end), [maxInflow, maxInflow]]},
+                [2, 1],
+                [total, 2]
+            ];
+
+            if (end >= total) {
+                return ["Simulation Complete. Max Inflow: " + maxInflow.toFixed(2),
+                        "Temperature: 0", extendData, true];
+            }
+            return ["Max Inflow: " + maxInflow.toFixed(2),
+                    "Current Temperature: " + data.temperature[end - 1].toFixed(2),
+                    extendData, false];
+        }
+    })
+});
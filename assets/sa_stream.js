@@ -0,0 +1,63 @@
+// Live streaming of a simulated annealing run.
+// start_stream in callbacks/simulated_annealing.py resets the chart and
+// puts the stream URL in the stream-request store; this opens it as an
+// EventSource and appends every (coalesced) frame to the chart as it arrives.
+
+// The open stream, if any; only one run streams at a time
+let saStreamSource = null;
+
+function saCloseStream() {
+    if (saStreamSource) {
+        saStreamSource.close();
+        saStreamSource = null;
+    }
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    sa: Object.assign({}, (window.dash_clientside || {}).sa, {
+        openStream: function (request) {
+            const set_props = window.dash_clientside.set_props;
+            saCloseStream();
+            if (!request) {
+                return "closed";
+            }
+
+            const lineEnd = Math.max(request.background_length - 1, 0);
+            let maxInflow = 0;
+            const source = new EventSource(request.url);
+            saStreamSource = source;
+
+            source.onmessage = function (event) {
+                const frame = JSON.parse(event.data);
+                maxInflow = frame.accepted[frame.accepted.length - 1];
+
+                // Append to the Accepted Inflow trace (2) and replace the two
+                // points of the Max Inflow line (1) by capping it at 2 points
+                set_props('inflow-graph-dynamic', {extendData: [
+                    {x: [frame.iterations, [0, lineEnd]], y: [frame.accepted, [maxInflow, maxInflow]]},
+                    [2, 1],
+                    [1e9, 2]
+                ]});
+                set_props('max-inflow-output', {children: "Max Inflow: " + maxInflow.toFixed(2)});
+                set_props('temperature-output', {children: "Current Temperature: " + frame.temperature.toFixed(2)});
+            };
+
+            source.addEventListener('done', function () {
+                set_props('max-inflow-output', {children: "Simulation Complete. Max Inflow: " + maxInflow.toFixed(2)});
+                set_props('temperature-output', {children: "Temperature: 0"});
+                if (saStreamSource === source) {
+                    saCloseStream();
+                }
+            });
+
+            // EventSource reconnects on its own, which would start a new run
+            source.onerror = function () {
+                if (saStreamSource === source) {
+                    saCloseStream();
+                }
+            };
+
+            return "streaming";
+        }
+    })
+});
@@ -0,0 +1,47 @@
+'''Step time of SA as the visited path set grows.
+
+Builds a network with many edge-disjoint source-to-sink paths, so nearly
+every accepted move adds a path to visited_paths, and reports the mean step
+time over consecutive windows. With the edge owner index the step time should
+stay flat however large the visited set gets.
+
+    python -m benchmarks.conservation_step --paths 5000 --steps 20000
+'''
+import argparse
+import time
+import networkx as nx
+from algorithms.simulated_annealing import SA
+
+
+def parallel_paths_graph(n_paths, capacity=10):
+    # source 0 -> middle node i -> sink n_paths + 1, for every i
+    sink = n_paths + 1
+    G = nx.DiGraph()
+    for i in range(1, n_paths + 1):
+        G.add_edge(0, i, capacity=capacity)
+        G.add_edge(i, sink, capacity=capacity)
+
+    return G
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paths", type=int, default=5000)
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--window", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    sa = SA(parallel_paths_graph(args.paths), 1e9, 1e-9, seed=args.seed)
+
+    print(f"{'steps':>8} {'visited':>8} {'us/step':>8}")
+    for done in range(0, args.steps, args.window):
+        start = time.perf_counter()
+        for _ in range(args.window):
+            sa.step()
+        elapsed = time.perf_counter() - start
+        print(f"{done + args.window:>8} {len(sa.visited_paths):>8} {1e6 * elapsed / args.window:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
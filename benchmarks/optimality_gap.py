@@ -0,0 +1,317 @@
+'''How close SA gets to the true maximum flow, and how fast.
+
+Generates families of synthetic networks (layered DAGs, grids and random
+sparse graphs) at a range of sizes, computes their exact maximum flow as
+ground truth and runs SA on each. Per run it records the construction time,
+steps per second, the time and step at which the best inflow first reached
+each fraction of the optimum, the final gap and the peak memory. Results go
+to a JSON file (by default a new timestamped one in benchmarks/results),
+rewritten as each run finishes so an interrupted benchmark keeps the rows it
+got to; pass an earlier file as --baseline to compare against it.
+--schedule, --patience and --reheat-to run SA with another cooling schedule
+and stopping rules (see algorithms/schedules.py), to compare steps and gap.
+
+    python -m benchmarks.optimality_gap --sizes 50 500 5000 50000 --output gap.json
+    python -m benchmarks.optimality_gap --output new.json --baseline gap.json
+    python -m benchmarks.optimality_gap --schedule adaptive --patience 5000 --output adaptive.json --baseline gap.json
+
+In every generated network node 0 is the source and the highest-numbered
+node the sink, as SA expects. Unless --paths says otherwise, paths are
+enumerated up to --enumerate-below edges and sampled by random walks above.
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+import networkx as nx
+import numpy as np
+from networkx.algorithms.flow import preflow_push
+from algorithms.path_providers import PATH_PROVIDERS
+from algorithms.schedules import SCHEDULES, Stopping
+from algorithms.simulated_annealing import SA
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import maximum_flow as scipy_maximum_flow
+except ImportError:
+    scipy_maximum_flow = None
+
+FRACTIONS = (0.5, 0.9, 0.95, 0.99, 1.0)
+
+
+def layered_dag(n_edges, rng, max_capacity=20, out_degree=3):
+    ''' Layers of equal width; each node feeds out_degree random nodes of the next layer. '''
+    width = max(2, int((n_edges / out_degree) ** 0.5))
+    layers = max(1, n_edges // (out_degree * width))
+    sink = layers * width + 1
+
+    G = nx.DiGraph()
+    for i in range(width):
+        G.add_edge(0, 1 + i, capacity=rng.randint(1, max_capacity))
+        G.add_edge(1 + (layers - 1) * width + i, sink, capacity=rng.randint(1, max_capacity))
+    for layer in range(layers - 1):
+        first, next_first = 1 + layer * width, 1 + (layer + 1) * width
+        for u in range(first, first + width):
+            for v in rng.sample(range(next_first, next_first + width), min(out_degree, width)):
+                G.add_edge(u, v, capacity=rng.randint(1, max_capacity))
+
+    return G
+
+
+def grid(n_edges, rng, max_capacity=20):
+    ''' Square grid with edges pointing right and down, from the top left to the bottom right corner. '''
+    side = max(2, int((n_edges / 2) ** 0.5))
+    G = nx.DiGraph()
+    for r in range(side):
+        for c in range(side):
+            node = r * side + c
+            if c + 1 < side:
+                G.add_edge(node, node + 1, capacity=rng.randint(1, max_capacity))
+            if r + 1 < side:
+                G.add_edge(node, node + side, capacity=rng.randint(1, max_capacity))
+
+    return G
+
+
+def random_sparse(n_edges, rng, max_capacity=20, mean_degree=3):
+    '''Uniformly random directed edges (cycles included) with mean_degree out-edges per node.
+
+    Should the edges leave the sink unreachable from the source, one more
+    edge joins a node the source reaches to one that reaches the sink.
+    '''
+    n_nodes = max(3, n_edges // mean_degree)
+    G = nx.DiGraph()
+    G.add_nodes_from(range(n_nodes))
+    while G.number_of_edges() < n_edges:
+        u, v = rng.randrange(n_nodes), rng.randrange(n_nodes)
+        if u != v:
+            G.add_edge(u, v, capacity=rng.randint(1, max_capacity))
+
+    sink = n_nodes - 1
+    if not nx.has_path(G, 0, sink):
+        u = rng.choice(sorted(nx.descendants(G, 0) | {0}))
+        v = rng.choice(sorted(nx.ancestors(G, sink) | {sink}))
+        G.add_edge(u, v, capacity=rng.randint(1, max_capacity))
+
+    return G
+
+
+FAMILIES = {'layered': layered_dag, 'grid': grid, 'sparse': random_sparse}
+
+
+def exact_max_flow(G, source, sink):
+    ''' Maximum flow value, with SciPy's implementation when it is installed. '''
+    if scipy_maximum_flow is not None:
+        nodes = list(G.nodes)
+        index = {node: i for i, node in enumerate(nodes)}
+        rows = [index[u] for u, v in G.edges]
+        cols = [index[v] for u, v in G.edges]
+        capacity = [c for _, _, c in G.edges(data='capacity')]
+        matrix = csr_matrix((np.array(capacity, dtype=np.int32), (rows, cols)), shape=(len(nodes), len(nodes)))
+        return int(scipy_maximum_flow(matrix, index[source], index[sink]).flow_value)
+
+    return nx.maximum_flow_value(G, source, sink, flow_func=preflow_push)
+
+
+def path_factory(name):
+    # SA calls this as paths(G, source, target, state); None means EnumeratedPaths
+    return PATH_PROVIDERS[name]
+
+
+def make_schedule(name, a):
+    # --rate is the rate (or Lundy-Mees beta) of every schedule but the logarithmic one
+    return SCHEDULES[name]() if name == 'logarithmic' else SCHEDULES[name](a)
+
+
+def run_sa(G, optimum, T, a, seed, paths, time_limit, max_steps, schedule='geometric', stopping=None):
+    ''' One SA run on G, stopped when it cools down, a stopping rule ends it or it hits the time or step limit. '''
+    start = time.perf_counter()
+    sa = SA(G, T, a, paths=path_factory(paths), seed=seed, schedule=make_schedule(schedule, a), stopping=stopping)
+    construction_time = time.perf_counter() - start
+
+    time_to = {fraction: None for fraction in FRACTIONS}
+    steps_to = {fraction: None for fraction in FRACTIONS}
+    pending = list(FRACTIONS)
+    steps = 0
+    start = time.perf_counter()
+    deadline = start + time_limit
+    while sa.running and steps < max_steps:
+        sa.step()
+        steps += 1
+        while pending and optimum and sa.best_inflow >= pending[0] * optimum:
+            time_to[pending[0]] = time.perf_counter() - start
+            steps_to[pending.pop(0)] = steps
+        # Checking the clock every step would cost more than some steps do
+        if steps % 256 == 0 and time.perf_counter() > deadline:
+            break
+    run_time = time.perf_counter() - start
+
+    return {
+        'construction_time': construction_time,
+        'steps': steps,
+        'run_time': run_time,
+        'steps_per_s': steps / run_time if run_time else None,
+        'best_inflow': sa.best_inflow,
+        'stop_reason': sa.stop_reason or ('frozen' if not sa.running else 'limit'),
+        'reheats': sa.reheats,
+        'gap': 1 - sa.best_inflow / optimum if optimum else None,
+        'time_to': {str(f): t for f, t in time_to.items()},
+        'steps_to': {str(f): s for f, s in steps_to.items()},
+    }
+
+
+def peak_memory(G, T, a, seed, paths, steps, schedule='geometric', stopping=None):
+    # Measured in a separate run, since tracemalloc slows everything down
+    tracemalloc.start()
+    try:
+        sa = SA(G, T, a, paths=path_factory(paths), seed=seed, schedule=make_schedule(schedule, a), stopping=stopping)
+        for _ in range(steps):
+            if not sa.running:
+                break
+            sa.step()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(families, sizes, seeds, T, a, paths=None, enumerate_below=200,
+              time_limit=10.0, max_steps=10**7, memory_steps=1000, schedule='geometric', stopping=None,
+              on_row=None):
+    # on_row, if given, is called with the rows so far after each one
+    results = []
+    for family in families:
+        for size in sizes:
+            for seed in seeds:
+                rng = random.Random(seed)
+                G = FAMILIES[family](size, rng)
+                source, sink = 0, max(G.nodes)
+
+                start = time.perf_counter()
+                optimum = exact_max_flow(G, source, sink)
+                max_flow_time = time.perf_counter() - start
+
+                provider = paths or ('enumerated' if G.number_of_edges() < enumerate_below else 'random-walk')
+                row = {
+                    'family': family,
+                    'size': size,
+                    'seed': seed,
+                    'nodes': G.number_of_nodes(),
+                    'edges': G.number_of_edges(),
+                    'paths': provider,
+                    'T': T,
+                    'a': a,
+                    'schedule': schedule,
+                    'optimum': optimum,
+                    'max_flow_time': max_flow_time,
+                }
+                row.update(run_sa(G, optimum, T, a, seed, provider, time_limit, max_steps, schedule, stopping))
+                if memory_steps:
+                    row['peak_memory'] = peak_memory(G, T, a, seed, provider, memory_steps, schedule, stopping)
+                results.append(row)
+                if on_row is not None:
+                    on_row(results)
+                print(f"{family:>8} {row['edges']:>7} seed={seed:<3} opt={optimum:<6} best={row['best_inflow']:<6} "
+                      f"gap={row['gap'] if row['gap'] is not None else float('nan'):6.1%} "
+                      f"{row['steps_per_s']:>9.0f} steps/s  build {row['construction_time']:.3f}s")
+
+    return results
+
+
+def default_output():
+    # A new file per run, so earlier results are never overwritten
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', f"optimality_gap-{stamp}.json")
+
+
+def write_report(report, path):
+    # Through a temporary file, so the file is never left half written
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp, path)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    '''Print steps/s, steps taken, gap and time-to-90% against a baseline file, for
+    rows run on the same network with the same path provider, T and a.
+    '''
+    key = lambda row: (row['family'], row['size'], row['seed'], row['paths'], row['T'], row['a'])
+    old_rows = {key(row): row for row in baseline['results']}
+    print(f"\ncompared with {baseline.get('commit')}:")
+    for row in results:
+        old = old_rows.get(key(row))
+        if old is None:
+            continue
+        speed = row['steps_per_s'] / old['steps_per_s'] if old['steps_per_s'] else float('nan')
+        print(f"{row['family']:>8} {row['edges']:>7} seed={row['seed']:<3} steps/s x{speed:.2f}  "
+              f"steps {old['steps']} -> {row['steps']}  "
+              f"gap {old['gap'] if old['gap'] is not None else float('nan'):.1%} -> "
+              f"{row['gap'] if row['gap'] is not None else float('nan'):.1%}  "
+              f"time to 90%: {old['time_to']['0.9']} -> {row['time_to']['0.9']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--families", nargs="+", choices=sorted(FAMILIES), default=sorted(FAMILIES))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000],
+                        help="approximate number of edges of each generated network")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1])
+    parser.add_argument("--temp", type=float, default=12)
+    parser.add_argument("--rate", type=float, default=0.001)
+    parser.add_argument("--paths", choices=sorted(PATH_PROVIDERS))
+    parser.add_argument("--enumerate-below", type=int, default=200)
+    parser.add_argument("--time-limit", type=float, default=10.0, help="seconds per SA run")
+    parser.add_argument("--max-steps", type=int, default=10**7)
+    parser.add_argument("--memory-steps", type=int, default=1000,
+                        help="steps of the separate peak memory run (0 to skip it)")
+    parser.add_argument("--schedule", choices=sorted(SCHEDULES), default='geometric')
+    parser.add_argument("--patience", type=int, help="stop after this many steps without a new best inflow")
+    parser.add_argument("--reheat-to", type=float, help="on running out of patience, reheat to this temperature")
+    parser.add_argument("--max-reheats", type=int, default=3)
+    parser.add_argument("--output", help="JSON file to write (default: a new file in benchmarks/results)")
+    parser.add_argument("--baseline", help="earlier --output file to compare with")
+    args = parser.parse_args(argv)
+
+    stopping = Stopping(patience=args.patience, reheat_to=args.reheat_to,
+                        max_reheats=args.max_reheats if args.reheat_to is not None else 0)
+    output = args.output or default_output()
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'networkx': nx.__version__,
+        'max_flow': 'scipy' if scipy_maximum_flow is not None else 'networkx preflow_push',
+        'complete': False,  # Until every run has finished
+        'results': [],
+    }
+
+    def save(results):
+        report['results'] = results
+        write_report(report, output)
+
+    results = benchmark(args.families, args.sizes, args.seeds, args.temp, args.rate, args.paths,
+                        args.enumerate_below, args.time_limit, args.max_steps, args.memory_steps,
+                        args.schedule, stopping, on_row=save)
+    report['complete'] = True
+    save(results)
+    print(f"results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+'''Cold start time of the Dash app.
+
+Each measurement runs in a fresh interpreter: the time to import app (which
+registers every callback) and then the time until the first session has its
+default background, which is when the path store and the default trajectory
+are first needed (the trajectory is computed by a background job).
+"cold" starts with an empty cache directory; "warm" reuses the one the cold
+run filled, as a restarted worker would.
+
+    python -m benchmarks.startup --repeat 5
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+PROBE = '''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+from callbacks.simulated_annealing import jobs, new_session
+session = new_session('probe')
+# The default background is computed by a background job unless cached
+while session['job'] is not None and jobs.poll(session['job'], owner='probe')['state'] == 'running':
+    time.sleep(0.005)
+print(json.dumps({'import': imported - start, 'first_session': time.perf_counter() - imported}))
+'''
+
+
+def measure(cache_dir):
+    env = dict(os.environ, SA_TRAJECTORY_CACHE_DIR=cache_dir)
+    out = subprocess.run([sys.executable, '-c', PROBE], env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'cache':>6} {'import ms':>10} {'first session ms':>17}")
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for label in ('cold', 'warm'):
+                times = measure(cache_dir)
+                print(f"{label:>6} {times['import'] * 1e3:>10.1f} {times['first_session'] * 1e3:>17.1f}")
+
+
+if __name__ == '__main__':
+    main()
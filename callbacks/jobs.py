@@ -0,0 +1,132 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Workers push progress (and check for cancellation) at most this often
+REPORT_EVERY_S = 0.1
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _run_job(fn, key, args, progress, cancelled):
+    # Runs in a pool process. fn reports progress as a fraction in [0, 1];
+    # reporting is throttled and is also where a cancelled job stops.
+    last = [0.0]
+
+    def report(fraction):
+        now = time.monotonic()
+        if now - last[0] < REPORT_EVERY_S:
+            return
+        last[0] = now
+        if cancelled.get(key):
+            raise JobCancelled(key)
+        progress[key] = fraction
+
+    return fn(*args, report=report)
+
+
+class JobRunner:
+    '''Runs long computations in a process pool, off the request threads.
+
+    Jobs are identified by a key: submitting a key that is already in flight
+    joins the existing job instead of starting another. Each job can have
+    owners (e.g. browser sessions); when an owner submits something else, its
+    previous job is cancelled unless another owner still waits for it. Job
+    functions take a `report` keyword, which they call with their progress
+    fraction; progress and cancellation are shared through a Manager.
+    The pool and Manager are only started on the first submit.
+    '''
+
+    def __init__(self, processes=None):
+        self.processes = processes
+        self._executor = None
+        self._progress = None
+        self._cancelled = None
+        self._jobs = {}  # key -> {'future', 'owners'}
+        self._owners = {}  # owner -> key
+        self._lock = threading.Lock()
+
+    def _start(self):
+        if self._executor is None:
+            self._manager = multiprocessing.Manager()
+            self._progress = self._manager.dict()
+            self._cancelled = self._manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.processes)
+
+    def submit(self, key, fn, *args, owner=None):
+        with self._lock:
+            self._start()
+            if owner is not None and self._owners.get(owner) != key:
+                self._release(owner)
+
+            job = self._jobs.get(key)
+            if job is None:
+                self._progress[key] = 0.0
+                self._cancelled.pop(key, None)
+                future = self._executor.submit(_run_job, fn, key, args, self._progress, self._cancelled)
+                job = self._jobs[key] = {'future': future, 'owners': set()}
+
+            if owner is not None:
+                job['owners'].add(owner)
+                self._owners[owner] = key
+
+        return key
+
+    def release(self, owner):
+        ''' Stop waiting for owner's job, cancelling it if nobody else is. '''
+        with self._lock:
+            self._release(owner)
+
+    def _release(self, owner):
+        key = self._owners.pop(owner, None)
+        job = self._jobs.get(key)
+        if job is None:
+            return
+        job['owners'].discard(owner)
+        if not job['owners']:
+            self._cancel(key)
+
+    def _cancel(self, key):
+        job = self._jobs.pop(key)
+        if not job['future'].cancel():
+            # Already running: the worker stops at its next progress report
+            self._cancelled[key] = True
+        self._progress.pop(key, None)
+
+    def cancel(self, key):
+        with self._lock:
+            if key in self._jobs:
+                for owner in self._jobs[key]['owners']:
+                    self._owners.pop(owner, None)
+                self._cancel(key)
+
+    def poll(self, key, owner=None):
+        '''State of a job: 'running' (with 'progress'), 'done' (with 'result'),
+        'failed' (with 'error') or 'unknown' for keys not in flight.
+
+        A finished job is forgotten once every owner has polled it.
+        '''
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                return {'state': 'unknown'}
+
+            future = job['future']
+            if not future.done():
+                return {'state': 'running', 'progress': self._progress.get(key, 0.0)}
+
+            if owner is not None:
+                job['owners'].discard(owner)
+                if self._owners.get(owner) == key:
+                    del self._owners[owner]
+            if not job['owners']:
+                del self._jobs[key]
+                self._progress.pop(key, None)
+
+            error = future.exception()
+            if error is not None:
+                return {'state': 'failed', 'error': error}
+            return {'state': 'done', 'result': future.result()}
@@ -0,0 +1,162 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows; disk sessions are then not locked between processes
+    fcntl = None
+
+
+class MemorySessionStore:
+    '''Per-session simulation state held in this process.
+
+    Least recently used sessions are dropped once there are more than
+    `max_sessions`, and any session untouched for `ttl` seconds expires. Only
+    suitable for a single worker process.
+    '''
+
+    def __init__(self, max_sessions=256, ttl=3600):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._session_locks = {}
+
+    @contextmanager
+    def locked(self, session_id):
+        # One lock per session, so updates of different sessions run in parallel
+        with self._lock:
+            lock = self._session_locks.setdefault(session_id, threading.Lock())
+        with lock:
+            yield
+
+    def update(self, session_id, fn, default):
+        '''Apply fn to the session and store it, as one step no other update
+        of the same session interleaves with. A missing session is created
+        with default(). Returns what fn returns.
+        '''
+        with self.locked(session_id):
+            session = self.get(session_id)
+            if session is None:
+                session = default()
+            result = fn(session)
+            self.set(session_id, session)
+            return result
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            stamp, data = entry
+            if time.time() - stamp > self.ttl:
+                del self._sessions[session_id]
+                self._session_locks.pop(session_id, None)
+                return None
+            self._sessions.move_to_end(session_id)
+            return data
+
+    def set(self, session_id, data):
+        with self._lock:
+            self._sessions[session_id] = (time.time(), data)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                expired, _ = self._sessions.popitem(last=False)
+                self._session_locks.pop(expired, None)
+
+
+class DiskSessionStore:
+    '''Per-session simulation state pickled to one file per session.
+
+    Every worker process pointing at the same directory sees the same
+    sessions, so any of them can continue a run. Writes go to a temporary file
+    that is renamed into place, and files older than `ttl` seconds are removed
+    as new sessions are written. update() locks the session with a lock file
+    next to it, which holds across processes.
+    '''
+
+    def __init__(self, directory, ttl=3600, sweep_every=100):
+        self.directory = directory
+        self.ttl = ttl
+        self.sweep_every = sweep_every
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id, suffix='.pkl'):
+        # Session ids come from the browser; keep only filename-safe characters
+        safe = ''.join(c for c in str(session_id) if c.isalnum() or c in '-_')
+        return os.path.join(self.directory, f"{safe}{suffix}")
+
+    @contextmanager
+    def locked(self, session_id):
+        if fcntl is None:
+            yield
+            return
+        with open(self._path(session_id, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                os.utime(lock_file.name)  # keep it from expiring while in use
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def update(self, session_id, fn, default):
+        ''' As MemorySessionStore.update, locked across worker processes. '''
+        with self.locked(session_id):
+            session = self.get(session_id)
+            if session is None:
+                session = default()
+            result = fn(session)
+            self.set(session_id, session)
+            return result
+
+    def get(self, session_id):
+        path = self._path(session_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def set(self, session_id, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(session_id))
+
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self._remove_expired()
+
+    def _remove_expired(self):
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def create_session_store():
+    '''Session store chosen by environment variables.
+
+    SA_SESSION_STORE=memory (default) keeps sessions in this process;
+    SA_SESSION_STORE=disk shares them between worker processes through
+    SA_SESSION_DIR. SA_SESSION_TTL sets the expiry in seconds for both.
+    '''
+    ttl = float(os.environ.get('SA_SESSION_TTL', 3600))
+    if os.environ.get('SA_SESSION_STORE', 'memory') == 'disk':
+        directory = os.environ.get('SA_SESSION_DIR', os.path.join(tempfile.gettempdir(), 'sa_sessions'))
+        return DiskSessionStore(directory, ttl=ttl)
+
+    return MemorySessionStore(ttl=ttl)
@@ -1,41 +1,387 @@
-from dash.dependencies import Input, Output
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import numpy as np
+from dash.dependencies import Input, Output, State, ClientsideFunction
 import dash
-from dash import callback_context
+from dash import callback_context, Patch
+from flask import jsonify, request, Response
 from algorithms.simulated_annealing import SA  # Import your algorithm class
-from utils import plot_inflow_over_iterations
-import networkx as nx
-import random
-from collections import deque
+from algorithms.graphs import configured_graph, graph_fingerprint
+from algorithms.path_providers import PATH_PROVIDERS, configured_paths
+from algorithms.schedules import FINAL_T
+from algorithms.path_store import PathStore
+from algorithms.trajectory_cache import TrajectoryCache
+from callbacks.jobs import JobRunner
+from callbacks.session_store import create_session_store
+from callbacks.streaming import StepStream, run_engine, sse_events
+from utils import bucket_size, cooling_progress, inflow_trajectory, inflow_figure, inflow_window, minmax_decimate_chunk
 import plotly.graph_objects as go
 
 
-# Global variables or data initialization can go here
-# Instantiate your Simulated Annealing class with a sample graph
-G = nx.DiGraph()
-G.add_edges_from([(0, 1, {'flow': 5}), (0, 1,{'capacity': 10}),
- (0, 2,{'flow': 3}), (0, 2,{'capacity': 8}),
-  (0,3,{'flow': 4}), (0,3,{'capacity': 11}),
-   (1,2, {'flow': 3}), (1,2,{'capacity': 9}),
-    (1,5, {'flow': 2}), (1,5,{'capacity': 3}),              # modified from last sversion: edge (1,4) replaced by edge (1,5)
-     (2,4, {'flow': 7}), (2,4,{'capacity': 9}),
-      (2,5, {'flow': 1}), (2,5,{'capacity': 8}),
-       (3,2, {'flow': 2}), (3,2,{'capacity': 8}),
-        (3,4,{'flow': 2}), (3,4,{'capacity': 12}),
-         (4,5, {'flow': 9}), (4,5,{'capacity': 9})])
+# The network to anneal: a file named by SA_GRAPH (see
+# algorithms/graphs.configured_graph), or the 6-node demo network
+G, SOURCE, SINK = configured_graph()
 
+# Where SA gets candidate paths (SA_PATHS, see path_providers.configured_paths)
+PATHS = configured_paths()
+
+# Defaults and ranges, matching the inputs in layouts/simulated_annealing.py
 INIT_T = 12
 INIT_A = 0.2
 SEED = 5
+T_RANGE = (1, 100)
+A_RANGE = (0.01, 0.99)
+
+# Streamed runs each step in their own thread; at most this many at a time
+MAX_STREAMS = int(os.environ.get('SA_MAX_STREAMS', 4))
+stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
+
+# In "batch" run mode each Interval tick runs steps for about this long
+# (half of the 100 ms interval), but never more than MAX_BATCH_STEPS
+FRAME_BUDGET_S = 0.05
+MAX_BATCH_STEPS = 5000
+
+# Static background trajectories are cached per (graph, seed, T, a), in memory
+# and on disk, since users keep toggling between the same few settings
+graph_id = graph_fingerprint(G)
+# Runs also depend on where their paths come from
+run_id = graph_id if PATHS == 'enumerated' else f"{graph_id}-{PATHS}"
+CACHE_DIR = os.environ.get('SA_TRAJECTORY_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'sa_trajectories'))
+trajectory_cache = TrajectoryCache(directory=CACHE_DIR)
+
+# Nothing is enumerated or annealed at import time, so workers start (and
+# restart) quickly; see benchmarks/startup.py
+_path_store = None
+
+def get_path_store():
+    '''The enumerated paths of G, shared read-only between every SA instance.
+
+    Enumerated on first use and saved next to the trajectory cache, so later
+    processes memory-map the saved store instead of enumerating again.
+    '''
+    global _path_store
+    if _path_store is None:
+        directory = os.path.join(CACHE_DIR, f"paths-{graph_id}")
+        try:
+            _path_store = PathStore.load(directory)
+        except FileNotFoundError:
+            store = PathStore.enumerate(G, SOURCE, SINK)
+            # Save under a temporary name and rename it into place, so
+            # concurrent workers never load a partial store
+            tmp_directory = tempfile.mkdtemp(dir=CACHE_DIR)
+            store.save(tmp_directory)
+            try:
+                os.replace(tmp_directory, directory)
+            except OSError:
+                shutil.rmtree(tmp_directory, ignore_errors=True)  # Another worker got there first
+            _path_store = store
+
+    return _path_store
+
+def engine_options():
+    # Constructor arguments shared by every engine on G
+    if PATHS == 'enumerated':
+        return {'source': SOURCE, 'target': SINK, 'path_store': get_path_store()}
+    return {'source': SOURCE, 'target': SINK, 'paths': PATH_PROVIDERS[PATHS]}
+
+def new_engine(T, a, seed):
+    return SA(G, T, a, seed=seed, **engine_options())
+
+def restore_engine(state):
+    return SA.from_state(G, state, **engine_options())
+
+def stopped(state):
+    # Whether the snapshotted run has ended, like SA.running but without
+    # restoring the engine; dashboard engines use the default final_T
+    return state['control']['stop_reason'] is not None or state['T'] < FINAL_T
+
+# Animated runs stay live in the worker that last stepped them, since
+# rebuilding an engine can cost far more than a tick (a k-shortest provider
+# reruns Yen's algorithm). A tick restores the session's snapshot only when
+# another worker stepped the run since, or the engine was dropped here.
+MAX_LIVE_ENGINES = int(os.environ.get('SA_LIVE_ENGINES', 32))
+live_engines = OrderedDict()  # session id -> (run id, engine)
+live_engines_lock = threading.Lock()
+
+def live_engine(session_id, session):
+    with live_engines_lock:
+        run, sa = live_engines.get(session_id, (None, None))
+    if run == session['run'] and sa.iteration == session['engine']['control']['iteration']:
+        return sa
+    return restore_engine(session['engine'])
+
+def keep_engine(session_id, session, sa):
+    with live_engines_lock:
+        live_engines[session_id] = (session['run'], sa)
+        live_engines.move_to_end(session_id)
+        while len(live_engines) > MAX_LIVE_ENGINES:
+            live_engines.popitem(last=False)
+
+def unset(T, a):
+    # Dash passes None for a cleared or out of range number input; like a
+    # zero temperature, that gives an empty run rather than an error
+    return T is None or a is None
+
+def static_trajectory(seed, T, a, report=None):
+    if unset(T, a):
+        return []
+
+    def compute():
+        sa_static = new_engine(T, a, seed)
+        return inflow_trajectory(sa_static, T, seed, report=report)
+
+    return trajectory_cache.get_or_compute(TrajectoryCache.key(run_id, seed, T, a), compute).tolist()
+
+def cached_static_trajectory(seed, T, a):
+    # The static trajectory if it is already cached, else None
+    if unset(T, a):
+        return []
+    trajectory = trajectory_cache.get(TrajectoryCache.key(run_id, seed, T, a))
+    return None if trajectory is None else trajectory.tolist()
+
+def replay_trajectory(seed, T, a, report=None):
+    '''Candidate inflow, accepted inflow and temperature of every step of a full run.
+
+    This is the same run the animation steps through on the server for these
+    settings, as a (3, steps) array.
+    '''
+    if unset(T, a):
+        return [[], [], []]
+
+    def compute():
+        sa = new_engine(T, a, seed)
+        steps = []
+        while sa.running:
+            curr_inflow, max_inflow, _, temperature = sa.step()
+            steps.append((curr_inflow, max_inflow, temperature))
+            if report is not None:
+                report(cooling_progress(T, temperature, sa.stopping.final_T))
+        return list(zip(*steps)) if steps else [[], [], []]
+
+    return trajectory_cache.get_or_compute(TrajectoryCache.key(run_id, seed, T, a, kind='replay'), compute)
+
+def cached_replay_trajectory(seed, T, a):
+    # The replay trajectory if it is already cached, else None
+    if unset(T, a):
+        return [[], [], []]
+    return trajectory_cache.get(TrajectoryCache.key(run_id, seed, T, a, kind='replay'))
+
+# Everything that changes while a user runs the simulation lives in a
+# per-session record, so browser sessions (and worker processes) never share it
+sessions = create_session_store()
+
+# Trajectories that are not cached yet (static backgrounds, including the
+# default one of a new session, and replays) are computed here, so a long
+# anneal never holds up a request; results land in the (disk) trajectory cache
+jobs = JobRunner()
+
+def stream_settings(args):
+    '''Seed, T and a of a /sa/stream request, checked like the Dash inputs.
+
+    Missing values take the defaults; anything else out of range raises
+    ValueError, since a rate of 0 or less would never cool down.
+    '''
+    seed = int(args.get('seed', SEED))
+    T = float(args.get('T', INIT_T))
+    a = float(args.get('a', INIT_A))
+    if seed < 1:
+        raise ValueError(f"seed must be at least 1, not {seed}")
+    if not T_RANGE[0] <= T <= T_RANGE[1]:
+        raise ValueError(f"T must be between {T_RANGE[0]} and {T_RANGE[1]}, not {T}")
+    if not A_RANGE[0] <= a <= A_RANGE[1]:
+        raise ValueError(f"a must be between {A_RANGE[0]} and {A_RANGE[1]}, not {a}")
+
+    return seed, T, a
+
+def run_stream(sa, stream):
+    # Thread body of a streamed run; frees its slot when the run ends
+    try:
+        run_engine(sa, stream)
+    finally:
+        stream_slots.release()
+
+def submit_static_trajectory(session_id, seed, T, a):
+    # Compute a static background in the background, replacing the session's previous job
+    return jobs.submit(TrajectoryCache.key(run_id, seed, T, a), static_trajectory, seed, T, a, owner=session_id)
 
-sa_static = SA(G, INIT_T, INIT_A)
-sa_dynamic = SA(G, INIT_T, INIT_A)
-# inflow_data = deque()
-last_n_clicks = 0
-# Initial setup for the static background inflow figure
-static_fig, inflow_data = plot_inflow_over_iterations(sa_static, INIT_T, INIT_A, SEED)
-dynamic_fig = go.Figure(static_fig)
+def replay_owner(session_id):
+    # Replay jobs are owned separately, so they don't cancel the session's background job
+    return f"{session_id}-replay"
+
+def new_session(session_id):
+    # The default background if it is cached; otherwise it is computed in
+    # the background and update_simulation polls for it
+    session = {
+        'seed': SEED,
+        'T': INIT_T,
+        'a': INIT_A,
+        'last_n_clicks': 0,
+        'background': None,  # Settings (seed, T, a) of the static background shown
+        'background_length': 0,
+        'engine': None,  # SA.get_state() of the animated run
+        'run': None,  # Id of the animated run, to match it with a live engine
+        'iteration': 0,  # Steps taken by the animated run
+        'figure': None,  # What the browser's figure holds: None, 'static' or 'dynamic'
+        'job': None,  # Key of the background job computing the background, if any
+    }
+    inflow_data = cached_static_trajectory(SEED, INIT_T, INIT_A)
+    if inflow_data is None:
+        session['job'] = submit_static_trajectory(session_id, SEED, INIT_T, INIT_A)
+    else:
+        set_background(session, SEED, INIT_T, INIT_A, inflow_data)
+
+    return session
+
+def set_background(session, seed, T, a, inflow_data):
+    # A session keeps only the settings of its background; the points stay in
+    # the trajectory cache, so storing the session doesn't grow with the run
+    session['background'] = (seed, T, a)
+    session['background_length'] = len(inflow_data)
+
+def background_data(session_id, session):
+    '''The session's background points from the trajectory cache.
+
+    If the cache has evicted them, they are recomputed by a background job
+    (which update_simulation polls for, as after a change of settings) and
+    this returns an empty placeholder, so no request runs a whole anneal.
+    '''
+    if session['background'] is None:
+        return []
+    inflow_data = cached_static_trajectory(*session['background'])
+    if inflow_data is None:
+        if session.get('job') is None:
+            session['job'] = submit_static_trajectory(session_id, *session['background'])
+        return []
+    return inflow_data
+
+def max_inflow_trace(length, max_inflow):
+    # A horizontal line only needs its two end points
+    return go.Scatter(
+        x=[0, max(length - 1, 0)],
+        y=[max_inflow, max_inflow],
+        mode='lines',
+        name='Max Inflow',
+        line=dict(dash='dash', color='red')
+    )
+
+def background_figure(session, inflow_data):
+    # Zooming survives animation ticks, but not a change of background
+    return inflow_figure(inflow_data, revision=f"{session['seed']}-{session['T']}-{session['a']}")
+
+def accepted_inflow_trace(iterations, accepted):
+    # The animated run's accepted inflow, one point per step taken so far
+    return go.Scattergl(
+        x=iterations,
+        y=accepted,
+        mode='lines',
+        name='Accepted Inflow',
+        line=dict(color='orange')
+    )
+
+# Smooth transition animation
+TRANSITION = dict(duration=500, easing='cubic-in-out')
+
+def dynamic_figure_update(session_id, session, iterations, accepted, restarted, max_inflow=None):
+    '''Figure output for one animation tick.
+
+    `iterations` and `accepted` are the points produced since the last tick.
+    The static background is only sent when the browser does not have it yet;
+    otherwise a Patch adds the Max Inflow line (trace 1) and the Accepted
+    Inflow trace (trace 2) once, then just moves the line and appends the new
+    points, so each tick costs a few bytes instead of the whole trajectory.
+    The new points are decimated like the background (a run as long as it
+    keeps to about POINT_BUDGET points), so the trace stays bounded too.
+    '''
+    if accepted:
+        max_inflow = accepted[-1]
+    iterations, accepted = minmax_decimate_chunk(iterations, accepted, bucket_size(session['background_length']))
+    iterations, accepted = iterations.tolist(), accepted.tolist()
+    if session['figure'] is None:
+        fig = background_figure(session, background_data(session_id, session))
+        fig.add_trace(max_inflow_trace(session['background_length'], max_inflow))
+        fig.add_trace(accepted_inflow_trace(iterations, accepted))
+        fig.update_layout(transition=TRANSITION)
+        session['figure'] = 'dynamic'
+        return fig
+
+    patch = Patch()
+    if session['figure'] == 'static':
+        patch['data'].append(max_inflow_trace(session['background_length'], max_inflow).to_plotly_json())
+        patch['data'].append(accepted_inflow_trace(iterations, accepted).to_plotly_json())
+        patch['layout']['transition'] = TRANSITION
+        session['figure'] = 'dynamic'
+    else:
+        patch['data'][1]['y'] = [max_inflow, max_inflow]
+        if restarted:
+            patch['data'][2]['x'] = iterations
+            patch['data'][2]['y'] = accepted
+        else:
+            patch['data'][2]['x'].extend(iterations)
+            patch['data'][2]['y'].extend(accepted)
+
+    return patch
+
+def advance(sa, session, mode):
+    '''Step the animated run for one frame.
+
+    In "step" mode that is a single step; in "batch" mode steps are taken
+    until FRAME_BUDGET_S has passed (or MAX_BATCH_STEPS), so the animation
+    speed follows the engine instead of the Interval. Stops early once the
+    run completes. Returns the new points and the last temperature.
+    '''
+    deadline = time.perf_counter() + FRAME_BUDGET_S
+    budget = MAX_BATCH_STEPS if mode == 'batch' else 1
+    iterations, accepted = [], []
+
+    for _ in range(budget):
+        _, max_inflow, _, temperature = sa.step()
+        iterations.append(session['iteration'])
+        accepted.append(max_inflow)
+        session['iteration'] += 1
+        if not sa.running or time.perf_counter() >= deadline:
+            break
+
+    return iterations, accepted, temperature
 
 def register_callbacks_sa(app):
+    @app.server.route('/sa/cache-stats')
+    def cache_stats():
+        # Hit/miss counters of this worker's trajectory cache, for monitoring
+        return jsonify(trajectory_cache.stats)
+
+    @app.server.route('/sa/stream')
+    def stream_run():
+        '''Server-sent events of a live run with the given seed, T and a.
+
+        The run steps in its own thread and is pushed as it goes, in
+        coalesced frames (see callbacks/streaming.py); it stops when it
+        completes or when the browser closes the connection. Settings out of
+        the inputs' ranges get a 400, and once MAX_STREAMS runs are streaming
+        further requests get a 503.
+        '''
+        try:
+            seed, T, a = stream_settings(request.args)
+        except ValueError as error:
+            return Response(f"{error}\n", status=400, mimetype='text/plain')
+        if not stream_slots.acquire(blocking=False):
+            return Response("Too many runs are streaming, try again later\n", status=503, mimetype='text/plain')
+
+        stream = StepStream()
+        try:
+            sa = new_engine(T, a, seed)
+        except BaseException:
+            stream_slots.release()
+            raise
+        threading.Thread(target=run_stream, args=(sa, stream), daemon=True).start()
+
+        return Response(sse_events(stream), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
     @app.callback(
     [
         Output('max-inflow-output', 'children'),
@@ -53,81 +399,331 @@ def register_callbacks_sa(app):
         Input("temp-input", "value"),
         Input("cooling-rate-input", "value")
     ],
+    [
+        State('session-id', 'data'),
+        State('run-mode', 'value')
+    ],
     prevent_initial_call=True  # Prevent callback from being called on initial load
     )
 
-    def update_simulation(n_intervals, n_clicks, seed_value, temp_value, cooling_rate_value):
-        global inflow_data, dynamic_fig, static_fig, sa_dynamic, last_n_clicks, SEED, INIT_T, INIT_A
+    def update_simulation(n_intervals, n_clicks, seed_value, temp_value, cooling_rate_value, session_id, run_mode):
+        # Interval ticks fire on their own from page load on, before the
+        # mode radio has been touched
+        run_mode = run_mode or 'step'
 
-        # Update global variables with new input values
-        SEED = seed_value
-        INIT_T = temp_value
-        INIT_A = cooling_rate_value
+        # Reads and writes of the session happen under its lock, so callbacks
+        # of the same session never overwrite each other's changes
+        def simulate(session):
+            # Update the session with new input values
+            session['seed'] = seed_value
+            session['T'] = temp_value
+            session['a'] = cooling_rate_value
 
-        # Determine which input triggered the callback
-        triggered_id = callback_context.triggered[0]['prop_id'].split('.')[0]
+            # Determine which input triggered the callback
+            triggered_id = callback_context.triggered[0]['prop_id'].split('.')[0]
 
-        # If seed, temp, or cooling rate changes, update static and dynamic backgrounds
-        if triggered_id in {"seed-input", "temp-input", "cooling-rate-input"}:
-            random.seed(SEED)
-            sa_static = SA(G, INIT_T, INIT_A)
-            static_fig, inflow_data = plot_inflow_over_iterations(sa_static, INIT_T, INIT_A, SEED)
-            
-            # Set dynamic_fig to be static_fig initially
-            dynamic_fig = go.Figure(static_fig)
-            
-            return  (dash.no_update, 
-                    dash.no_update, 
-                    dynamic_fig, 
-                    dash.no_update, 
-                    False, False, False)
-        
-        # Reset the simulation if the button is clicked again after completion
-        if n_clicks != last_n_clicks:
-            random.seed(SEED)
-            last_n_clicks = n_clicks
-            sa_dynamic = SA(G, INIT_T, INIT_A)   # Reset the simulated annealing object
-            # Reset the intervals
-            n_intervals = 0 
-
-        # Run a single step of simulated annealing
-        _, max_inflow, _, temperature = sa_dynamic.step()
-
-        # Check if the simulation is complete
-        if temperature < 0.01:
-            return (f"Simulation Complete. Max Inflow: {max_inflow:.2f}", 
-                    "Temperature: 0", 
+            # If seed, temp, or cooling rate changes, update static and dynamic backgrounds
+            if triggered_id in {"seed-input", "temp-input", "cooling-rate-input"}:
+                inflow_data = cached_static_trajectory(session['seed'], session['T'], session['a'])
+                if inflow_data is None:
+                    # Compute it in the background (replacing this session's
+                    # previous job) and poll for it on the interval ticks
+                    session['job'] = submit_static_trajectory(session_id, session['seed'], session['T'], session['a'])
+                    return ("Computing the background run...", 
+                            dash.no_update, 
+                            dash.no_update, 
+                            False, 
+                            False, False, False)
+
+                if session.get('job') is not None:
+                    jobs.release(session_id)
+                    session['job'] = None
+                set_background(session, session['seed'], session['T'], session['a'], inflow_data)
+                static_fig = background_figure(session, inflow_data)
+                session['figure'] = 'static'
+
+                # Set dynamic_fig to be static_fig initially
+                return  (dash.no_update, 
+                        dash.no_update, 
+                        static_fig, 
+                        dash.no_update, 
+                        False, False, False)
+
+            # Waiting for a background job: report its progress until it is done
+            if session.get('job') is not None:
+                status = jobs.poll(session['job'], owner=session_id)
+                if status['state'] == 'unknown':
+                    # Started by another worker process or before a restart;
+                    # it may have finished into the shared cache already
+                    inflow_data = cached_static_trajectory(session['seed'], session['T'], session['a'])
+                    if inflow_data is None:
+                        session['job'] = submit_static_trajectory(session_id, session['seed'], session['T'], session['a'])
+                        status = {'state': 'running', 'progress': 0.0}
+                    else:
+                        status = {'state': 'done', 'result': inflow_data}
+
+                if status['state'] == 'running':
+                    return (f"Computing the background run: {status['progress']:.0%}", 
+                            dash.no_update, 
+                            dash.no_update, 
+                            False, 
+                            dash.no_update, 
+                            dash.no_update, 
+                            dash.no_update)
+
+                key, session['job'] = session['job'], None
+                if status['state'] == 'failed':
+                    return (f"Computing the background run failed: {status['error']}", 
+                            dash.no_update, 
+                            dash.no_update, 
+                            True, 
+                            False, False, False)
+
+                # A pool worker may have answered from the memory cache it was
+                # forked with, so make sure this process finds the result again
+                if cached_static_trajectory(session['seed'], session['T'], session['a']) is None:
+                    trajectory_cache.set(key, status['result'])
+                set_background(session, session['seed'], session['T'], session['a'], status['result'])
+                static_fig = background_figure(session, status['result'])
+                session['figure'] = 'static'
+
+                # Keep ticking only if an animated run is still under way
+                finished = session['engine'] is not None and stopped(session['engine'])
+                return ("", 
+                        dash.no_update, 
+                        static_fig, 
+                        finished or run_mode in ('replay', 'stream'), 
+                        False, False, False)
+
+            # Replay runs entirely in the browser (see start_replay) and streamed
+            # runs are pushed by the server (see start_stream), so stop polling
+            if run_mode in ('replay', 'stream'):
+                session['last_n_clicks'] = n_clicks
+                return (dash.no_update, 
+                        dash.no_update, 
+                        dash.no_update, 
+                        True, 
+                        dash.no_update, 
+                        dash.no_update, 
+                        dash.no_update)
+
+            # Reset the simulation if the button is clicked again after completion
+            restarted = n_clicks != session['last_n_clicks'] or session['engine'] is None
+            if restarted:
+                session['last_n_clicks'] = n_clicks
+                session['iteration'] = 0
+                session['run'] = uuid.uuid4().hex
+                sa_dynamic = new_engine(session['T'], session['a'], session['seed'])   # Reset the simulated annealing object
+            else:
+                # Continue this session's run, wherever it was last stepped
+                sa_dynamic = live_engine(session_id, session)
+
+            # Run one frame's worth of simulated annealing steps
+            iterations, accepted, temperature = advance(sa_dynamic, session, run_mode)
+            max_inflow = accepted[-1]
+            session['engine'] = sa_dynamic.get_state()
+            keep_engine(session_id, session, sa_dynamic)
+            dynamic_fig = dynamic_figure_update(session_id, session, iterations, accepted, restarted)
+
+            # Check if the simulation is complete
+            if not sa_dynamic.running:
+                return (f"Simulation Complete. Max Inflow: {max_inflow:.2f}", 
+                        "Temperature: 0", 
+                        dynamic_fig, 
+                        True, 
+                        False, 
+                        False, 
+                        False)
+
+            return (f"Max Inflow: {max_inflow:.2f}", 
+                    f"Current Temperature: {temperature:.2f}", 
                     dynamic_fig, 
-                    True, 
                     False, 
-                    False, 
-                    False)
-        
-        # Clear previous Max Inflow trace
-        dynamic_fig.data = [trace for trace in dynamic_fig.data if trace.name != "Max Inflow"]
-
-        # Add new max_inflow trace
-        dynamic_fig.add_trace(go.Scatter(
-            x=list(range(len(inflow_data))),  
-            y=[max_inflow] * len(inflow_data),  
-            mode='lines',
-            name='Max Inflow',
-            line=dict(dash='dash', color='red')
-        ))
-
-        # Apply smooth transition animation
-        dynamic_fig.update_layout(
-            transition=dict(
-                duration=500,
-                easing='cubic-in-out'
-            )
-        )
-
-        return (f"Max Inflow: {max_inflow:.2f}", 
-                f"Current Temperature: {temperature:.2f}", 
-                dynamic_fig, 
-                False, 
-                True, 
-                True, 
-                True)
+                    True, 
+                    True, 
+                    True)
+
+        return sessions.update(session_id, simulate, lambda: new_session(session_id))
+
+    @app.callback(
+    [
+        Output('replay-data', 'data'),
+        Output('inflow-graph-dynamic', 'figure', allow_duplicate=True),
+        Output('replay-interval', 'n_intervals'),
+        Output('replay-interval', 'disabled'),
+        Output('replay-poll', 'disabled'),
+        Output('max-inflow-output', 'children', allow_duplicate=True)
+    ],
+    [
+        Input("run-simulation", "n_clicks"),
+        Input('replay-poll', 'n_intervals')
+    ],
+    [
+        State('run-mode', 'value'),
+        State('session-id', 'data')
+    ],
+    prevent_initial_call=True
+    )
+
+    def start_replay(n_clicks, n_polls, run_mode, session_id):
+        '''Ship a whole precomputed run to the browser in one payload.
+
+        The trajectory comes from the cache; if it is not there yet it is
+        computed by a background job, which the replay-poll interval checks
+        on. The replay-interval then drives a clientside callback
+        (assets/sa_replay.js), so a running replay puts no load on the server.
+        '''
+        triggered_id = callback_context.triggered[0]['prop_id'].split('.')[0]
+        if triggered_id == "run-simulation" and run_mode != 'replay':
+            return dash.no_update, dash.no_update, dash.no_update, True, True, dash.no_update
+
+        def replay(session):
+            seed, T, a = session['seed'], session['T'], session['a']
+            owner = replay_owner(session_id)
+            key = TrajectoryCache.key(run_id, seed, T, a, kind='replay')
+
+            if triggered_id == "run-simulation":
+                trajectory = cached_replay_trajectory(seed, T, a)
+                if trajectory is None:
+                    jobs.submit(key, replay_trajectory, seed, T, a, owner=owner)
+                    # Clear the chart while the run is computed
+                    fig = dynamic_figure_update(session_id, session, [], [], True)
+                    return (dash.no_update, fig, dash.no_update, True, False, 
+                            "Computing the run to replay...")
+            else:
+                status = jobs.poll(key, owner=owner)
+                if status['state'] == 'unknown':
+                    # Started by another worker process; it may have finished into the shared cache
+                    trajectory = cached_replay_trajectory(seed, T, a)
+                    if trajectory is None:
+                        jobs.submit(key, replay_trajectory, seed, T, a, owner=owner)
+                        status = {'state': 'running', 'progress': 0.0}
+                    else:
+                        status = {'state': 'done', 'result': trajectory}
+                if status['state'] == 'running':
+                    return (dash.no_update, dash.no_update, dash.no_update, True, False, 
+                            f"Computing the run to replay: {status['progress']:.0%}")
+                if status['state'] == 'failed':
+                    return (dash.no_update, dash.no_update, dash.no_update, True, True, 
+                            f"Computing the run to replay failed: {status['error']}")
+                trajectory = status['result']
+
+            candidate, accepted, temperature = np.asarray(trajectory, dtype=float).reshape(3, -1)
+            data = {
+                'candidate': candidate.astype(int).tolist(),
+                'accepted': accepted.astype(int).tolist(),
+                'temperature': temperature.round(4).tolist(),
+                'background_length': session['background_length'],
+            }
+
+            # Start from the background plus an empty Accepted Inflow trace
+            fig = dynamic_figure_update(session_id, session, [], [], True)
+
+            return data, fig, 0, False, True, ""
+
+        return sessions.update(session_id, replay, lambda: new_session(session_id))
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='sa', function_name='replayFrame'),
+        [
+            Output('max-inflow-output', 'children', allow_duplicate=True),
+            Output('temperature-output', 'children', allow_duplicate=True),
+            Output('inflow-graph-dynamic', 'extendData'),
+            Output('replay-interval', 'disabled', allow_duplicate=True)
+        ],
+        Input('replay-interval', 'n_intervals'),
+        State('replay-data', 'data'),
+        prevent_initial_call=True
+    )
+
+    @app.callback(
+    [
+        Output('stream-request', 'data'),
+        Output('inflow-graph-dynamic', 'figure', allow_duplicate=True)
+    ],
+    [
+        Input("run-simulation", "n_clicks"),
+        Input("seed-input", "value"),
+        Input("temp-input", "value"),
+        Input("cooling-rate-input", "value")
+    ],
+    [
+        State('run-mode', 'value'),
+        State('session-id', 'data')
+    ],
+    prevent_initial_call=True
+    )
+
+    def start_stream(n_clicks, seed_value, temp_value, cooling_rate_value, run_mode, session_id):
+        '''Point the browser at a live event stream of a run.
+
+        The figure is reset first; the clientside callback in
+        assets/sa_stream.js then opens the stream and appends to it as frames
+        arrive. Changing an input clears the request, which closes any open
+        stream.
+        '''
+        triggered_id = callback_context.triggered[0]['prop_id'].split('.')[0]
+        if triggered_id != "run-simulation":
+            return None, dash.no_update
+        if run_mode != 'stream':
+            return dash.no_update, dash.no_update
+
+        def reset(session):
+            fig = dynamic_figure_update(session_id, session, [], [], True)
+            data = {
+                'url': f"/sa/stream?seed={seed_value}&T={temp_value}&a={cooling_rate_value}",
+                'background_length': session['background_length'],
+                'run': n_clicks,
+            }
+            return data, fig
+
+        return sessions.update(session_id, reset, lambda: new_session(session_id))
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='sa', function_name='openStream'),
+        Output('stream-status', 'data'),
+        Input('stream-request', 'data'),
+        prevent_initial_call=True
+    )
+
+    @app.callback(
+        Output('inflow-graph-dynamic', 'figure', allow_duplicate=True),
+        Input('inflow-graph-dynamic', 'relayoutData'),
+        State('session-id', 'data'),
+        prevent_initial_call=True
+    )
+
+    def zoom_background(relayout_data, session_id):
+        '''Redraw the static background for the zoomed-in x range.
+
+        The background is decimated to a point budget; zooming in swaps in
+        the (up to full resolution) points of just the visible range, and
+        zooming back out restores the overview.
+        '''
+        relayout_data = relayout_data or {}
+        if 'xaxis.range[0]' in relayout_data:
+            x_range = (relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]'])
+        elif 'xaxis.range' in relayout_data:
+            x_range = relayout_data['xaxis.range']
+        elif relayout_data.get('xaxis.autorange'):
+            x_range = None
+        else:
+            return dash.no_update
+
+        session = sessions.get(session_id)
+        if session is None or session['figure'] is None:
+            return dash.no_update
+
+        # Evicted points are recomputed into the cache in the background;
+        # until then the figure keeps what it shows. This callback doesn't
+        # store the session, so it works on a copy.
+        inflow_data = background_data(session_id, dict(session))
+        if not len(inflow_data):
+            return dash.no_update
+
+        x, y = inflow_window(inflow_data, x_range)
+        patch = Patch()
+        patch['data'][0]['x'] = x.tolist()
+        patch['data'][0]['y'] = y.tolist()
 
+        return patch
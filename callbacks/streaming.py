@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+
+
+class StepStream:
+    '''Hands step results from a background engine thread to one HTTP response.
+
+    The engine publishes every step; the response takes whatever has piled up
+    since its last frame as a single coalesced frame, so a slow browser gets
+    fewer, larger messages rather than falling further behind. Once
+    `max_pending` points are waiting the engine blocks (backpressure) until
+    the response catches up or the stream is cancelled.
+    '''
+
+    def __init__(self, max_pending=20000):
+        self.max_pending = max_pending
+        self.cancelled = False
+        self.done = False
+        self._cond = threading.Condition()
+        self._iterations = []
+        self._accepted = []
+        self._temperature = None
+
+    def publish(self, iteration, accepted, temperature):
+        ''' Queue one step. Returns False once the consumer has gone away. '''
+        with self._cond:
+            while len(self._iterations) >= self.max_pending and not self.cancelled:
+                self._cond.wait()
+            if self.cancelled:
+                return False
+            self._iterations.append(iteration)
+            self._accepted.append(accepted)
+            self._temperature = temperature
+            self._cond.notify_all()
+            return True
+
+    def finish(self):
+        with self._cond:
+            self.done = True
+            self._cond.notify_all()
+
+    def cancel(self):
+        with self._cond:
+            self.cancelled = True
+            self._cond.notify_all()
+
+    def frames(self, min_interval=0.05):
+        '''Yield coalesced frames until the engine finishes.
+
+        Frames are at least `min_interval` seconds apart; every point
+        published in between is merged into the next one.
+        '''
+        while True:
+            with self._cond:
+                while not self._iterations and not self.done and not self.cancelled:
+                    self._cond.wait()
+                if not self._iterations:
+                    return
+                frame = {
+                    'iterations': self._iterations,
+                    'accepted': self._accepted,
+                    'temperature': self._temperature,
+                }
+                self._iterations, self._accepted = [], []
+                self._cond.notify_all()
+            yield frame
+            time.sleep(min_interval)
+
+
+def run_engine(sa, stream):
+    ''' Step sa until it completes (or the stream is cancelled), publishing every step. '''
+    iteration = 0
+    try:
+        while sa.running:
+            _, max_inflow, _, temperature = sa.step()
+            if not stream.publish(iteration, max_inflow, temperature):
+                return
+            iteration += 1
+    finally:
+        stream.finish()
+
+
+def sse_events(stream):
+    ''' Server-sent events for a StepStream; cancels the engine when the client disconnects. '''
+    try:
+        for frame in stream.frames():
+            yield f"data: {json.dumps(frame)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    finally:
+        stream.cancel()
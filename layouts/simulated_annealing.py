@@ -1,7 +1,10 @@
 from dash import dcc, html
 
-def create_layout_sa():
+def create_layout_sa(session_id=None):
     return html.Div([
+        # Identifies this browser session's simulation state on the server
+        dcc.Store(id='session-id', data=session_id),
+
         html.H1("Simulated Annealing - Network Flow Visualization"),
         
         html.H2("The Problem"),
@@ -41,8 +44,24 @@ def create_layout_sa():
         dcc.Input(id="cooling-rate-input", type="number", value=0.2, min=0.01, max=0.99, step=0.01),
         html.Br(),
 
+        html.Label("Animation:"),
+        dcc.RadioItems(id="run-mode", value="step", inline=True, options=[
+            {"label": "One step per frame", "value": "step"},
+            {"label": "As many steps as fit in a frame", "value": "batch"},
+            {"label": "Replay in the browser", "value": "replay"},
+            {"label": "Stream live from the server", "value": "stream"},
+        ]),
+
         html.Button("Run Simulation", id="run-simulation", n_clicks=0),
         dcc.Interval(id='interval', interval=100, n_intervals=0),
+        # Replay mode: the whole run is shipped once and animated client-side
+        dcc.Store(id='replay-data'),
+        dcc.Interval(id='replay-interval', interval=100, n_intervals=0, disabled=True),
+        # Checks on the background job computing a run to replay
+        dcc.Interval(id='replay-poll', interval=250, n_intervals=0, disabled=True),
+        # Stream mode: the server pushes steps as they are produced
+        dcc.Store(id='stream-request'),
+        dcc.Store(id='stream-status'),
         html.Div(id='inflow-output', children=[
             html.P(id="max-inflow-output"),
             html.P(id="temperature-output")
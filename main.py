@@ -3,32 +3,23 @@ from dash import dcc, html, callback_context
 import matplotlib.pyplot as plt
 from dash.dependencies import Input, Output
 import dash_cytoscape as cyto
-import networkx as nx
 from SA import SA
+from algorithms.graphs import configured_graph
+from algorithms.path_providers import PATH_PROVIDERS, configured_paths
 from collections import deque
-import random
 import plotly.graph_objects as go
 
-# Instantiate your Simulated Annealing class with a sample graph
-G = nx.DiGraph()
-G.add_edges_from([(0, 1, {'flow': 5}), (0, 1,{'capacity': 10}),
- (0, 2,{'flow': 3}), (0, 2,{'capacity': 8}),
-  (0,3,{'flow': 4}), (0,3,{'capacity': 11}),
-   (1,2, {'flow': 3}), (1,2,{'capacity': 9}),
-    (1,5, {'flow': 2}), (1,5,{'capacity': 3}),              # modified from last sversion: edge (1,4) replaced by edge (1,5)
-     (2,4, {'flow': 7}), (2,4,{'capacity': 9}),
-      (2,5, {'flow': 1}), (2,5,{'capacity': 8}),
-       (3,2, {'flow': 2}), (3,2,{'capacity': 8}),
-        (3,4,{'flow': 2}), (3,4,{'capacity': 12}),
-         (4,5, {'flow': 9}), (4,5,{'capacity': 9})])
-# Sample graph initialization here
+# The network to anneal: a file named by SA_GRAPH, or the demo network
+G, SOURCE, SINK = configured_graph()
+# Where SA gets candidate paths: SA_PATHS, or random walks on a loaded network
+PATHS = PATH_PROVIDERS[configured_paths()]
 
 INIT_T = 12
 INIT_A = 0.2
 SEED = 5
 
-sa_static = SA(G, INIT_T, INIT_A)
-sa_dynamic = SA(G, INIT_T, INIT_A)  # Initialize the simulated annealing class with your graph
+sa_static = SA(G, INIT_T, INIT_A, seed=SEED, source=SOURCE, target=SINK, paths=PATHS)
+sa_dynamic = SA(G, INIT_T, INIT_A, seed=SEED, source=SOURCE, target=SINK, paths=PATHS)  # Initialize the simulated annealing class with your graph
 
 app = dash.Dash(__name__)
 
@@ -38,17 +29,14 @@ inflow_data = []  # Initial inflow
 
 
 def plot_inflow_over_iterations(sa_instance, initial_temp, cooling_rate):
-    random.seed(SEED)
+    sa_instance.seed(SEED)
     global inflow_data  # Store inflow values for each iteration
     inflow_data = []
-    temperature = initial_temp
 
     # Run simulated annealing and collect inflow values at each iteration
-    while temperature > 0.01:
-        temperature = temperature*(1-cooling_rate)
-        curr_inflow, _, _, temperature = sa_instance.step()  # Run one iteration of SA
+    while sa_instance.running:
+        curr_inflow, _, _, _ = sa_instance.step()  # Run one iteration of SA
         inflow_data.append(curr_inflow)  # Store current inflow
-        temperature *= (1 - cooling_rate)  # Update temperature
 
     # Create the Plotly figure
     fig = go.Figure()
@@ -149,8 +137,7 @@ def update_simulation(n_intervals, n_clicks, seed_value, temp_value, cooling_rat
 
     # If seed, temp, or cooling rate changes, update static and dynamic backgrounds
     if triggered_id in {"seed-input", "temp-input", "cooling-rate-input"}:
-        random.seed(SEED)
-        sa_static = SA(G, INIT_T, INIT_A)
+        sa_static = SA(G, INIT_T, INIT_A, seed=SEED, source=SOURCE, target=SINK, paths=PATHS)
         static_fig, _ = plot_inflow_over_iterations(sa_static,INIT_T, INIT_A)
         
         # Set dynamic_fig to be static_fig initially
@@ -164,9 +151,8 @@ def update_simulation(n_intervals, n_clicks, seed_value, temp_value, cooling_rat
     
     # Reset the simulation if the button is clicked again after completion
     if n_clicks != last_n_clicks:
-        random.seed(SEED)
         last_n_clicks = n_clicks
-        sa_dynamic = SA(G, INIT_T, INIT_A)   # Reset the simulated annealing object
+        sa_dynamic = SA(G, INIT_T, INIT_A, seed=SEED, source=SOURCE, target=SINK, paths=PATHS)   # Reset the simulated annealing object
         # Reset the intervals
         n_intervals = 0 
 
@@ -0,0 +1,80 @@
+import functools
+import random
+import pytest
+from algorithms.graphs import sample_graph
+from algorithms.path_providers import KShortestPaths, RandomWalkPaths
+from algorithms.recorder import TrajectoryRecorder
+from algorithms.simulated_annealing import SA
+from benchmarks.optimality_gap import layered_dag
+
+
+def run(sa, steps):
+    return [sa.step()[:2] for _ in range(steps)]
+
+
+@pytest.mark.parametrize('paths', [None, RandomWalkPaths, functools.partial(KShortestPaths, k=8, refill_every=100)])
+def test_resume_matches_an_uninterrupted_run(tmp_path, paths):
+    G = layered_dag(200, random.Random(1))
+    uninterrupted = run(SA(G, 12, 0.01, paths=paths, seed=3), 600)
+
+    sa = SA(G, 12, 0.01, paths=paths, seed=3)
+    before = run(sa, 250)
+    sa.save_checkpoint(tmp_path / 'run.npz')
+    resumed = SA.from_checkpoint(G, tmp_path / 'run.npz', paths=paths)
+
+    assert before + run(resumed, 350) == uninterrupted
+
+
+def test_checkpoint_of_another_graph_is_refused(tmp_path):
+    sa = SA(sample_graph(), 12, 0.01, seed=3)
+    run(sa, 50)
+    sa.save_checkpoint(tmp_path / 'run.npz')
+
+    G = sample_graph()
+    G[4][5]['capacity'] = 10
+    with pytest.raises(ValueError):
+        SA.from_checkpoint(G, tmp_path / 'run.npz')
+
+
+@pytest.mark.parametrize('paths', [RandomWalkPaths, functools.partial(KShortestPaths, k=8, refill_every=100)])
+def test_state_restores_into_a_fresh_provider(paths):
+    G = layered_dag(200, random.Random(1))
+    uninterrupted = run(SA(G, 12, 0.01, paths=paths, seed=3), 600)
+
+    sa = SA(G, 12, 0.01, paths=paths, seed=3)
+    before = run(sa, 250)
+    restored = SA.from_state(G, sa.get_state(), paths=paths)
+
+    assert before + run(restored, 350) == uninterrupted
+
+
+def test_recording_resumes_with_the_checkpoint(tmp_path):
+    G = layered_dag(200, random.Random(1))
+    with TrajectoryRecorder(tmp_path / 'full.npy', buffer_size=64) as recorder:
+        sa = SA(G, 12, 0.01, seed=3)
+        sa.attach(recorder)
+        run(sa, 600)
+
+    sa = SA(G, 12, 0.01, seed=3)
+    recorder = TrajectoryRecorder(tmp_path / 'run.npy', buffer_size=64)
+    sa.attach(recorder)
+    run(sa, 250)
+    sa.save_checkpoint(tmp_path / 'run.npz')
+    run(sa, 100)  # steps after the checkpoint, lost with the interrupted run
+    recorder.close()
+
+    resumed = SA.from_checkpoint(G, tmp_path / 'run.npz')
+    with TrajectoryRecorder(tmp_path / 'run.npy', buffer_size=64, resume_at=resumed.iteration) as recorder:
+        resumed.attach(recorder)
+        run(resumed, 350)
+
+    assert (TrajectoryRecorder.load(tmp_path / 'run.npy') == TrajectoryRecorder.load(tmp_path / 'full.npy')).all()
+
+
+@pytest.mark.parametrize('paths', [None, RandomWalkPaths, functools.partial(KShortestPaths, k=8, refill_every=50)])
+def test_reset_repeats_the_run(paths):
+    sa = SA(layered_dag(200, random.Random(1)), 12, 0.01, paths=paths, seed=3)
+    first = run(sa, 300)
+    sa.reset()
+
+    assert run(sa, 300) == first
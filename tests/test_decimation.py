@@ -0,0 +1,21 @@
+import numpy as np
+from utils import bucket_size, minmax_decimate, minmax_decimate_chunk
+
+
+def test_chunks_keep_what_decimating_at_once_keeps():
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 50, 20000)
+    size = bucket_size(len(y))
+
+    chunks, start = [], 0
+    while start < len(y):
+        end = min(start + int(rng.integers(1, 900)), len(y))
+        chunks.append(minmax_decimate_chunk(np.arange(start, end), y[start:end], size))
+        start = end
+    x = np.concatenate([chunk_x for chunk_x, _ in chunks])
+
+    assert set(minmax_decimate(y)[0]) <= set(x)
+    assert (np.diff(x) > 0).all()
+    # At most two extra points for each bucket split between chunks
+    assert len(x) <= len(minmax_decimate(y)[0]) + 2 * len(chunks)
+    assert (np.concatenate([chunk_y for _, chunk_y in chunks]) == y[x]).all()
@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+from algorithms.graph_loader import from_arrays
+
+
+def test_node_id_does_not_truncate_labels():
+    graph = from_arrays(np.array(['ab', 'ef']), np.array(['ef', 'zz']), [1, 2])
+    assert graph.node_id('ef') == 1
+    for label in ['efXYZ', 'e', 5]:
+        with pytest.raises(KeyError):
+            graph.node_id(label)
+
+
+def test_node_id_of_integer_labels():
+    graph = from_arrays(np.array([1, 5]), np.array([5, 9]), [1, 2])
+    assert graph.node_id(5) == graph.node_id('5') == 1
+    for label in [5.5, '5.5', 'x', 2]:
+        with pytest.raises(KeyError):
+            graph.node_id(label)
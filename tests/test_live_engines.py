@@ -0,0 +1,29 @@
+from algorithms.schedules import FINAL_T, Stopping
+from callbacks import simulated_annealing as callbacks
+
+
+def test_ticks_reuse_the_live_engine_until_another_worker_steps_the_run():
+    sa = callbacks.new_engine(12, 0.2, 5)
+    sa.step()
+    session = {'run': 'run-1', 'engine': sa.get_state()}
+    callbacks.keep_engine('s', session, sa)
+    assert callbacks.live_engine('s', session) is sa
+
+    # Another worker took a step and saved the session
+    elsewhere = callbacks.restore_engine(session['engine'])
+    elsewhere.step()
+    session['engine'] = elsewhere.get_state()
+    restored = callbacks.live_engine('s', session)
+    assert restored is not sa and restored.iteration == elsewhere.iteration
+
+    assert callbacks.live_engine('s', dict(session, run='run-2')) is not sa
+
+
+def test_a_run_ended_by_a_stopping_rule_counts_as_stopped():
+    sa = callbacks.new_engine(12, 0.2, 5)
+    sa.step()
+    assert not callbacks.stopped(sa.get_state())
+
+    sa.stopping = Stopping(max_steps=2)
+    sa.step()
+    assert sa.T >= FINAL_T and callbacks.stopped(sa.get_state())
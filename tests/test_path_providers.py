@@ -0,0 +1,69 @@
+import functools
+import random
+import numpy as np
+import pytest
+from algorithms.batched_annealing import BatchedSA
+from algorithms.graph_loader import CompactGraph
+from algorithms.path_providers import KShortestPaths, RandomWalkPaths, configured_paths
+from algorithms.simulated_annealing import SA
+from benchmarks.optimality_gap import layered_dag
+
+
+def test_k_shortest_forgets_paths_that_left_the_pool():
+    G = layered_dag(300, random.Random(2))
+    sa = SA(G, 12, 0.005, paths=functools.partial(KShortestPaths, k=16, refill_every=50), seed=4)
+    for _ in range(3000):
+        sa.step()
+        for path in sa.visited_paths:
+            sa.paths.edges(path)  # still known while it holds flow
+
+    assert len(sa.paths._edges) <= len(sa.paths.pool) + len(sa.visited_paths)
+
+
+def test_random_walks_are_forgotten_once_they_hold_no_flow():
+    sa = SA(layered_dag(300, random.Random(2)), 12, 0.005, paths=RandomWalkPaths, seed=4)
+    for _ in range(3000):
+        sa.step()
+
+    assert set(sa.paths._edges) == sa.visited_paths
+
+
+def test_loaded_networks_sample_paths_by_default(monkeypatch):
+    monkeypatch.delenv('SA_PATHS', raising=False)
+    monkeypatch.delenv('SA_GRAPH', raising=False)
+    assert configured_paths() == 'enumerated'
+    monkeypatch.setenv('SA_GRAPH', 'network.csv')
+    assert configured_paths() == 'random-walk'
+    monkeypatch.setenv('SA_PATHS', 'k-shortest')
+    assert configured_paths() == 'k-shortest'
+    monkeypatch.setenv('SA_PATHS', 'widest')
+    with pytest.raises(ValueError):
+        configured_paths()
+
+
+def test_batched_chains_can_use_sampled_paths():
+    G = layered_dag(300, random.Random(2))
+    batched = BatchedSA(G, 12, 0.05, 4, seed=1, paths=RandomWalkPaths, sample_paths=200)
+    assert 0 < len(batched.store) <= 200
+    batched.run()
+    assert (batched.best_inflow > 0).all()
+
+
+def compact(tails, heads, capacity, sink):
+    arrays = [np.array(values, dtype=np.int64) for values in (tails, heads, capacity)]
+    return CompactGraph(*arrays, np.zeros(len(tails), dtype=np.int64), np.arange(sink + 1), 0, sink)
+
+
+def test_random_walks_skip_edges_without_capacity():
+    sa = SA(compact([0, 0, 1, 2], [1, 2, 3, 3], [5, 0, 4, 6], 3), 12, 0.01, paths=RandomWalkPaths, seed=1)
+    for _ in range(200):
+        sa.step()
+    assert sa.best_inflow == 4
+
+    with pytest.raises(ValueError, match="no path"):
+        SA(compact([0, 1], [1, 2], [0, 4], 2), 12, 0.01, paths=RandomWalkPaths, seed=1)
+
+
+def test_enumerating_no_paths_is_an_error():
+    with pytest.raises(ValueError, match="no path"):
+        SA(compact([0, 2], [1, 3], [5, 5], 3), 12, 0.01, seed=1)
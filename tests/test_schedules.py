@@ -0,0 +1,44 @@
+from algorithms.graphs import sample_graph
+from algorithms.schedules import AdaptiveCooling, Logarithmic, Stopping
+from algorithms.simulated_annealing import SA
+
+
+def test_simulated_annealing_twice_runs_the_same():
+    sa = SA(sample_graph(), 12, 0.01, seed=1, schedule=Logarithmic(), stopping=Stopping(patience=300))
+    sa.simulated_annealing(12, 0.01)
+    first = sa.iteration, sa.best_inflow, sa.stop_reason, sa.schedule.get_state()
+
+    sa.rng.seed(1)
+    sa.simulated_annealing(12, 0.01)
+    assert (sa.iteration, sa.best_inflow, sa.stop_reason, sa.schedule.get_state()) == first
+    assert sa.iteration > 300
+
+
+def test_simulated_annealing_restores_the_adaptive_rate():
+    sa = SA(sample_graph(), 12, 0.01, seed=1, schedule=AdaptiveCooling(0.01, window=10))
+    sa.simulated_annealing(12, 0.01)
+    sa.simulated_annealing(12, 0.01)
+    assert sa.iteration > 0
+    assert not sa.running
+
+
+def test_reheats_before_stopping():
+    sa = SA(sample_graph(), 12, 0.01, seed=1, stopping=Stopping(patience=50, reheat_to=5, max_reheats=2))
+    while sa.running:
+        sa.step()
+    assert sa.reheats == 2
+    assert sa.stop_reason == 'patience'
+
+
+def test_max_steps():
+    sa = SA(sample_graph(), 12, 0.001, seed=1, stopping=Stopping(max_steps=100))
+    while sa.running:
+        sa.step()
+    assert sa.iteration == 100
+    assert sa.stop_reason == 'max_steps'
+
+
+def test_time_budget_counts_the_first_step():
+    sa = SA(sample_graph(), 12, 0.01, seed=1, stopping=Stopping(time_budget=0))
+    sa.step()
+    assert (sa.iteration, sa.stop_reason) == (1, 'time_budget')
@@ -0,0 +1,35 @@
+import threading
+import time
+import pytest
+from callbacks.session_store import DiskSessionStore, MemorySessionStore
+
+
+@pytest.fixture(params=['memory', 'disk'])
+def store(request, tmp_path):
+    if request.param == 'disk':
+        return DiskSessionStore(str(tmp_path))
+    return MemorySessionStore()
+
+
+def test_concurrent_updates_are_not_lost(store):
+    def bump(session):
+        count = session['count']
+        time.sleep(0.001)  # widen the window between read and write
+        session['count'] = count + 1
+
+    def worker():
+        for _ in range(20):
+            store.update('s', bump, lambda: {'count': 0})
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.get('s')['count'] == 80
+
+
+def test_update_returns_what_fn_returns(store):
+    assert store.update('s', lambda session: session['x'], lambda: {'x': 1}) == 1
+    assert store.get('s') == {'x': 1}
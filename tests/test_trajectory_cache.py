@@ -0,0 +1,32 @@
+import numpy as np
+from algorithms.trajectory_cache import TrajectoryCache
+from callbacks import simulated_annealing as callbacks
+
+
+def test_key_separates_settings():
+    assert TrajectoryCache.key('g', 1, 12, 0.01) == TrajectoryCache.key('g', 1, 12.0, 0.01)
+    assert TrajectoryCache.key('g', 1, 12, 0.01) != TrajectoryCache.key('g', 1, 12, 0.02)
+    assert TrajectoryCache.key('g', 1, 12, 0.01) != TrajectoryCache.key('g', 1, 12, 0.01, kind='replay')
+
+
+def test_memory_and_disk_tiers(tmp_path):
+    cache = TrajectoryCache(max_entries=1, directory=str(tmp_path))
+    cache.get_or_compute('a', lambda: [1, 2, 3])
+    cache.get_or_compute('b', lambda: [4])  # pushes 'a' out of memory
+    assert cache.get('a').tolist() == [1, 2, 3]
+    assert cache.stats['disk_hits'] == 1
+
+
+def test_cleared_inputs_give_an_empty_trajectory():
+    # Dash passes None for a cleared or out of range number input
+    for T, a in [(None, 0.01), (12, None), (None, None)]:
+        assert callbacks.cached_static_trajectory(1, T, a) == []
+        assert callbacks.static_trajectory(1, T, a) == []
+        assert [list(column) for column in callbacks.replay_trajectory(1, T, a)] == [[], [], []]
+
+
+def test_zero_temperature_gives_an_empty_trajectory(monkeypatch, tmp_path):
+    # Keep the run (and any path store it saves) out of the app's shared cache directory
+    monkeypatch.setattr(callbacks, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(callbacks, 'trajectory_cache', TrajectoryCache(directory=str(tmp_path)))
+    assert np.asarray(callbacks.static_trajectory(1, 0, 0.01)).size == 0
@@ -1,34 +1,122 @@
+import math
+import numpy as np
 import plotly.graph_objects as go
-import random
+
+# Most points a trajectory trace is drawn with; longer trajectories are
+# decimated (see minmax_decimate) and zooming in fetches more detail
+POINT_BUDGET = 4000
 
 def plot_inflow_over_iterations(sa_instance, initial_temp, cooling_rate, seed):
-    random.seed(seed)
-    global inflow_data  # Store inflow values for each iteration
-    inflow_data = []
-    temperature = initial_temp
+    # cooling_rate is kept for callers; the engine's own schedule sets the cooling
+    inflow_data = inflow_trajectory(sa_instance, initial_temp, seed)
+
+    return inflow_figure(inflow_data), inflow_data
+
+def cooling_progress(initial_temp, temperature, final_temp=0.01):
+    # Fraction of the way from initial_temp down to final_temp, on a log scale
+    if initial_temp <= final_temp or temperature <= final_temp:
+        return 1.0
+    return min(1.0, max(0.0, math.log(initial_temp / temperature) / math.log(initial_temp / final_temp)))
 
-    if not temperature:
-        temperature = 0.0
+def inflow_trajectory(sa_instance, initial_temp, seed, report=None):
+    # report, if given, is called with the fraction of the run done so far
+    # The engine cools itself (by its schedule) and decides when the run is over
+    sa_instance.seed(seed)
+    inflow_data = []  # Store inflow values for each iteration
+
+    if not initial_temp:
+        return inflow_data
 
     # Run simulated annealing and collect inflow values at each iteration
-    while temperature > 0.01:
-        temperature = temperature*(1-cooling_rate)
+    while sa_instance.running:
         curr_inflow, _, _, temperature = sa_instance.step()  # Run one iteration of SA
         inflow_data.append(curr_inflow)  # Store current inflow
-        temperature *= (1 - cooling_rate)  # Update temperature
+        if report is not None:
+            report(cooling_progress(initial_temp, temperature, sa_instance.stopping.final_T))
+
+    return inflow_data
+
+def minmax_decimate(y, budget=POINT_BUDGET, start=0):
+    '''Reduce y to at most `budget` points without flattening its peaks.
+
+    The points are split into budget // 2 equal buckets and only the minimum
+    and maximum of each are kept, in order, so every spike and dip of the
+    full trajectory is still drawn. Returns the kept iterations (offset by
+    `start`) and values as arrays.
+    '''
+    y = np.asarray(y)
+    n = len(y)
+    if n <= budget:
+        return np.arange(start, start + n), y
+
+    keep = bucket_extremes(y, bucket_size(n, budget))
+
+    return start + keep, y[keep]
+
+def bucket_size(n, budget=POINT_BUDGET):
+    # Width of the buckets that minmax_decimate splits n points into
+    return -(-n // max(budget // 2, 1))
+
+def bucket_extremes(y, size, offset=0):
+    # Indices into y of the minimum and maximum of each bucket of `size`
+    # points, where the first bucket is missing its first `offset` points
+    n = len(y)
+    rows = -(-(offset + n) // size)
+    padded = np.full(rows * size, np.nan)  # NaN padding is ignored by nanargmin/nanargmax
+    padded[offset:offset + n] = y
+    buckets = padded.reshape(rows, size)
+
+    offsets = np.arange(rows) * size - offset
+    return np.union1d(offsets + np.nanargmin(buckets, axis=1), offsets + np.nanargmax(buckets, axis=1))
+
+def minmax_decimate_chunk(x, y, size):
+    '''minmax_decimate for a trajectory that arrives in chunks.
+
+    x are consecutive iterations. Buckets are `size` iterations wide and
+    aligned to iteration 0 rather than to the chunk, so the chunks together
+    keep about what decimating the whole trajectory at once would (plus the
+    extremes of buckets split between two chunks).
+    '''
+    x, y = np.asarray(x), np.asarray(y)
+    if size <= 1 or len(y) == 0:
+        return x, y
+
+    keep = bucket_extremes(y, size, offset=int(x[0]) % size)
+    return x[keep], y[keep]
+
+def inflow_window(inflow_data, x_range=None, budget=POINT_BUDGET):
+    '''Decimated (x, y) of the iterations within x_range, or of all of them.
+
+    Zoomed-in ranges hold fewer points, so they come back at (up to) full
+    resolution.
+    '''
+    lo, hi = 0, len(inflow_data)
+    if x_range is not None:
+        lo = min(max(int(math.floor(x_range[0])), 0), hi)
+        hi = max(min(int(math.ceil(x_range[1])) + 1, hi), lo)
+
+    return minmax_decimate(inflow_data[lo:hi], budget, start=lo)
+
+def inflow_figure(inflow_data, budget=POINT_BUDGET, revision=None):
+    '''Figure of a static inflow trajectory, decimated to `budget` points and
+    drawn with WebGL. Figures with the same `revision` keep the user's zoom
+    when one replaces another.
+    '''
+    x, y = inflow_window(inflow_data, budget=budget)
 
     # Create the Plotly figure
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=list(range(len(inflow_data))),
-        y=inflow_data,
+    fig.add_trace(go.Scattergl(
+        x=x,
+        y=y,
         mode='lines',
         name='Current Inflow'
     ))
     fig.update_layout(
         title="Current Inflow over Iterations",
         xaxis_title="Iteration",
-        yaxis_title="Current Inflow"
+        yaxis_title="Current Inflow",
+        uirevision=revision
     )
 
-    return fig, inflow_data
\ No newline at end of file
+    return fig
\ No newline at end of file